@@ -1,15 +1,24 @@
 # finora_budget_app.py
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, date
-import yfinance as yf
-import os
-import random
-import csv
-from passlib.hash import pbkdf2_sha256
+# Only what the login screen needs is imported here; see finora/startup.py
+from finora.auth import AuthBusy, save_user, user_exists, verify_user
+from finora.profiler import get_profiler, is_admin
+from finora.startup import warm_start
+
+# Fragments rerun on their own when one of their widgets changes, leaving the rest
+# of the page as it was; later Streamlit releases call this st.fragment
+fragment = getattr(st, 'fragment', None) or st.experimental_fragment
+
+st.set_page_config(page_title="Finora - Student Budget Manager", page_icon="💰", layout="centered")
 
-st.set_page_config(page_title="Student Budget Manager", layout="centered")
+# Section timings and disk I/O counts for this rerun, see finora/profiler.py
+profile = get_profiler().begin()
+profile.section("Page Setup")
+
+def finish_profile(page):
+    # Record the rerun before st.stop()/st.rerun() end the script early; later calls are no-ops
+    return get_profiler().finish(profile, page=page, user=st.session_state.get('username'))
 
  #
 st.markdown("""
@@ -106,113 +115,23 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-
-# Set page configuration
-st.set_page_config(page_title="Finora - Student Budget Manager", page_icon="💰")
-
-# -------------------- User Authentication --------------------
-def load_users():
-    if os.path.exists('users.csv'):
-        return pd.read_csv('users.csv')
-    return pd.DataFrame(columns=['Username', 'Password'])
-
-def save_user(username, password):
-    users = load_users()
-    hashed_password = pbkdf2_sha256.hash(password)
-    new_user = pd.DataFrame([[username, hashed_password]], columns=['Username', 'Password'])
-    users = pd.concat([users, new_user], ignore_index=True)
-    users.to_csv('users.csv', index=False)
-
-def verify_user(username, password):
-    users = load_users()
-    if username in users['Username'].values:
-        stored_hash = users[users['Username'] == username]['Password'].iloc[0]
-        return pbkdf2_sha256.verify(password, stored_hash)
-    return False
-
 # -------------------- User Progress Handling --------------------
-def load_user_progress():
-    columns = ['Username', 'XP', 'Coins', 'Redeemed_Rewards', 'Check_In_Streak', 'Last_Check_In', 'Quests_Completed', 'Quiz_Score']
-    if os.path.exists('user_progress.csv'):
-        try:
-            with open('user_progress.csv', 'r') as f:
-                raw_content = f.read()
-                if not raw_content.strip():
-                    st.warning("user_progress.csv is empty. Initializing new file.")
-                    df = pd.DataFrame(columns=columns)
-                    df.to_csv('user_progress.csv', index=False)
-                    return df
-                st.info(f"Raw contents of user_progress.csv:\n{raw_content[:500]}...")
-            
-            df = pd.read_csv('user_progress.csv', dtype={
-                'Username': str,
-                'XP': float,
-                'Coins': float,
-                'Redeemed_Rewards': str,
-                'Check_In_Streak': float,
-                'Last_Check_In': str,
-                'Quests_Completed': str,
-                'Quiz_Score': float
-            }, na_values=['', 'NaN'], keep_default_na=False, skipinitialspace=True)
-            
-            if not all(col in df.columns for col in columns):
-                st.error("user_progress.csv is missing required columns. Initializing new file.")
-                df = pd.DataFrame(columns=columns)
-                df.to_csv('user_progress.csv', index=False)
-                return df
-            
-            def safe_eval(x):
-                try:
-                    return eval(x) if pd.notna(x) and x != '' and isinstance(x, str) else []
-                except:
-                    return []
-            
-            df['Redeemed_Rewards'] = df['Redeemed_Rewards'].apply(safe_eval)
-            df['Quests_Completed'] = df['Quests_Completed'].apply(safe_eval)
-            df['Last_Check_In'] = pd.to_datetime(df['Last_Check_In'], errors='coerce')
-            
-            df = df.dropna(subset=['Username', 'XP', 'Coins', 'Check_In_Streak', 'Quiz_Score'])
-            if df.empty and len(pd.read_csv('user_progress.csv').index) > 0:
-                st.warning("All rows in user_progress.csv were invalid. Initializing new file.")
-                df = pd.DataFrame(columns=columns)
-                df.to_csv('user_progress.csv', index=False)
-            
-            return df
-        except Exception as e:
-            st.error(f"Failed to parse user_progress.csv: {str(e)}. Initializing new file.")
-            df = pd.DataFrame(columns=columns)
-            df.to_csv('user_progress.csv', index=False)
-            return df
-    else:
-        st.info("user_progress.csv not found. Initializing new file.")
-        df = pd.DataFrame(columns=columns)
-        df.to_csv('user_progress.csv', index=False)
-        return df
+def load_user_progress(username):
+    from finora.progress import get_progress_store
+    progress_store = get_progress_store()
+    if progress_store.load_error:
+        st.error(progress_store.load_error)
+        progress_store.load_error = None
+    return progress_store.get(username)
 
 def save_user_progress(username, xp, coins, redeemed_rewards, check_in_streak, last_check_in, quests_completed, quiz_score):
-    progress = load_user_progress()
-    xp = float(xp) if xp is not None and isinstance(xp, (int, float)) else 0.0
-    coins = float(coins) if coins is not None and isinstance(coins, (int, float)) else 0.0
-    check_in_streak = float(check_in_streak) if check_in_streak is not None and isinstance(check_in_streak, (int, float)) else 0.0
-    quiz_score = float(quiz_score) if quiz_score is not None and isinstance(quiz_score, (int, float)) else 0.0
-    redeemed_rewards = list(redeemed_rewards) if isinstance(redeemed_rewards, (list, tuple)) else []
-    quests_completed = list(quests_completed) if isinstance(quests_completed, (list, tuple)) else []
-    last_check_in_str = last_check_in.strftime('%Y-%m-%d %H:%M:%S') if pd.notnull(last_check_in) else ''
-    username = str(username).replace(',', '').replace('"', '') if username else 'unknown'
-    
-    if username in progress['Username'].values:
-        progress.loc[progress['Username'] == username, [
-            'XP', 'Coins', 'Redeemed_Rewards', 'Check_In_Streak', 'Last_Check_In', 'Quests_Completed', 'Quiz_Score'
-        ]] = [xp, coins, str(redeemed_rewards), check_in_streak, last_check_in_str, str(quests_completed), quiz_score]
-    else:
-        new_progress = pd.DataFrame([[
-            username, xp, coins, str(redeemed_rewards), check_in_streak, last_check_in_str, str(quests_completed), quiz_score
-        ]], columns=['Username', 'XP', 'Coins', 'Redeemed_Rewards', 'Check_In_Streak', 'Last_Check_In', 'Quests_Completed', 'Quiz_Score'])
-        progress = pd.concat([progress, new_progress], ignore_index=True)
-    
-    progress.to_csv('user_progress.csv', index=False, quoting=csv.QUOTE_NONNUMERIC, escapechar='\\')
+    # Staged in memory; the store only writes when something changed and coalesces flushes
+    from finora.progress import get_progress_store, normalize_record
+    record = normalize_record(xp, coins, redeemed_rewards, check_in_streak, last_check_in, quests_completed, quiz_score)
+    return get_progress_store().update(username, record)
 
 # -------------------- User Login --------------------
+profile.section("Login")
 if 'username' not in st.session_state:
     st.title("💰 Finora - Student Budget Manager")
     tab1, tab2 = st.tabs(["Login", "Register"])
@@ -223,13 +142,17 @@ if 'username' not in st.session_state:
         login_password = st.text_input("Password", type="password", key="login_password")
         if st.button("Login"):
             if login_username and login_password:
-                if verify_user(login_username, login_password):
+                try:
+                    authenticated = verify_user(login_username, login_password)
+                except AuthBusy as e:
+                    authenticated = None
+                    st.warning(str(e))
+                if authenticated:
                     st.session_state['username'] = login_username
                     st.session_state['goals'] = {}
                     st.session_state['emergency_fund_goal'] = 0
-                    progress = load_user_progress()
-                    if login_username in progress['Username'].values:
-                        user_row = progress[progress['Username'] == login_username].iloc[0]
+                    user_row = load_user_progress(login_username)
+                    if user_row is not None:
                         st.session_state['xp'] = user_row['XP']
                         st.session_state['coins'] = user_row['Coins']
                         st.session_state['redeemed_rewards'] = user_row['Redeemed_Rewards']
@@ -246,8 +169,9 @@ if 'username' not in st.session_state:
                         st.session_state['quests_completed'] = []
                         st.session_state['quiz_score'] = 0
                     st.success(f"Welcome, {login_username}!")
+                    finish_profile("Login")
                     st.rerun()
-                else:
+                elif authenticated is not None:
                     st.error("Invalid username or password.")
             else:
                 st.warning("Please enter both username and password.")
@@ -259,57 +183,102 @@ if 'username' not in st.session_state:
         reg_confirm_password = st.text_input("Confirm Password", type="password", key="reg_confirm_password")
         if st.button("Register"):
             if reg_username and reg_password and reg_confirm_password:
-                users = load_users()
-                if reg_username in users['Username'].values:
+                if user_exists(reg_username):
                     st.error("This username is already taken. Please choose a different username.")
                 elif reg_password != reg_confirm_password:
                     st.error("Passwords do not match.")
                 elif len(reg_password) < 6:
                     st.error("Password must be at least 6 characters long.")
                 else:
-                    save_user(reg_username, reg_password)
-                    st.success("Registration successful! Please log in.")
+                    try:
+                        if save_user(reg_username, reg_password):
+                            st.success("Registration successful! Please log in.")
+                        else:
+                            st.error("This username is already taken. Please choose a different username.")
+                    except AuthBusy as e:
+                        st.warning(str(e))
             else:
                 st.warning("Please fill in all fields.")
 
+    # Load the rest of the app in the background while the user types
+    warm_start()
+    finish_profile("Login")
     st.stop()
-else:
-    st.sidebar.success(f"👋 Welcome, {st.session_state['username']}!")
-    if st.sidebar.button("Logout"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
-        st.rerun()
+
+# Shared by every page; already loaded when the warm start has finished
+import pandas as pd
+import numpy as np
+from finora.aggregates import record_entry, user_aggregates
+from finora.leaderboard import get_leaderboard
+from finora.ledger import get_ledger
+from finora.money import PAISE, format_inr, rupees, to_paise
+from finora.progress import get_progress_store
+from finora.rewards import get_rewards
+from finora.rules import ACHIEVEMENTS, QUESTS, entry_xp, evaluate, extract_features, milestone_status, new_quest_completions
+from finora.streaks import compute_streaks
+
+st.sidebar.success(f"👋 Welcome, {st.session_state['username']}!")
+if st.sidebar.button("Logout"):
+    finish_profile("Logout")
+    get_progress_store().flush()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    st.rerun()
 
 # -------------------- Data Handling --------------------
-if 'data' not in st.session_state:
-    if os.path.exists('user_data.csv'):
-        try:
-            st.session_state['data'] = pd.read_csv('user_data.csv', parse_dates=['Date'])
-            required_columns = ['Username', 'Type', 'Amount', 'Category', 'Date']
-            if not all(col in st.session_state['data'].columns for col in required_columns):
-                st.error("user_data.csv is missing required columns: Username, Type, Amount, Category, Date")
-                st.session_state['data'] = pd.DataFrame(columns=required_columns)
-                st.session_state['data'].to_csv('user_data.csv', index=False)
-                st.stop()
-            if not pd.api.types.is_datetime64_any_dtype(st.session_state['data']['Date']):
-                st.session_state['data']['Date'] = pd.to_datetime(st.session_state['data']['Date'], errors='coerce')
-                if st.session_state['data']['Date'].isna().any():
-                    st.error("Some dates in user_data.csv are invalid. Please ensure all dates are in a valid format.")
-                    st.stop()
-        except Exception as e:
-            st.error(f"Failed to load user_data.csv: {str(e)}")
-            st.session_state['data'] = pd.DataFrame(columns=['Username', 'Type', 'Amount', 'Category', 'Date'])
-            st.session_state['data'].to_csv('user_data.csv', index=False)
-            st.stop()
-    else:
-        st.session_state['data'] = pd.DataFrame(columns=['Username', 'Type', 'Amount', 'Category', 'Date'])
-        st.session_state['data'].to_csv('user_data.csv', index=False)
+profile.section("Data Handling")
+# The ledger and aggregate table are cached per process and shared by every
+# session; a write from any session invalidates them, so reruns reuse them for free
+ledger = get_ledger()
+try:
+    user_data = ledger.load_user(st.session_state['username'])
+    if user_data['Date'].isna().any():
+        st.error("Some dates in your ledger are invalid. Please ensure all dates are in a valid format.")
+        finish_profile("Data Handling")
+        st.stop()
+    aggregates = user_aggregates(ledger, st.session_state['username'])
+except Exception as e:
+    # A read failure leaves the stored ledger untouched; the next rerun tries again
+    st.error(f"Failed to load your ledger: {str(e)}")
+    finish_profile("Data Handling")
+    st.stop()
 
-# Filter data for the current user
-data = st.session_state['data']
-user_data = data[data['Username'] == st.session_state['username']].copy() if not data.empty else pd.DataFrame(columns=data.columns)
+# -------------------- Rewards --------------------
+# XP and coins are running balances in the rewards event ledger; the session
+# only mirrors them. A user's first render starts their log from the stored
+# progress, after that reading the balance is a lookup.
+rewards = get_rewards()
+account = rewards.account(st.session_state['username'])
+if account is None:
+    account = rewards.open(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
+                           entry_xp(aggregates), st.session_state['quiz_score'] * 5)
+st.session_state['xp'], st.session_state['coins'] = account.xp, account.coins
+
+def save_progress():
+    # Stage the session's progress in user_progress for the leaderboard and the next login
+    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
+                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
+                      st.session_state['last_check_in'], st.session_state['quests_completed'],
+                      st.session_state['quiz_score'])
+
+def refresh_balance():
+    account = rewards.account(st.session_state['username'])
+    st.session_state['xp'], st.session_state['coins'] = account.xp, account.coins
+    save_progress()
+
+def award(kind, xp=0, coins=0, key=''):
+    if not rewards.award(st.session_state['username'], kind, xp, coins, key):
+        return False
+    refresh_balance()
+    return True
+
+def sync_entry_xp():
+    # After the ledger changes: credit (or take back) XP for the entries added or replaced
+    if rewards.sync_entries(st.session_state['username'], entry_xp(user_aggregates(ledger, st.session_state['username']))):
+        refresh_balance()
 
 # -------------------- Sidebar Navigation --------------------
+profile.section("Sidebar")
 st.sidebar.markdown("## Main")
 menu = st.sidebar.radio("Navigate", ["Dashboard", "Add Entry", "Set Goals", "Financial Education"],
                        format_func=lambda x: {
@@ -327,36 +296,84 @@ st.sidebar.markdown("🧠 Set goals and learn financial tips!")
 
 # -------------------- Set Goals --------------------
 if menu == "Set Goals":
+    profile.section("Set Goals")
     st.subheader("🎯 Set Financial Goals")
     st.markdown("Set monthly budget or emergency fund goals to earn rewards!")
     
     # Monthly Budget Goals
     st.markdown("### 📅 Monthly Budget Goals")
     goal_type = st.selectbox("Goal Type", ["Savings", "Spending Limit"])
-    goal_amount = st.number_input("Goal Amount (₹)", min_value=0.0, step=100.0, key="budget_goal")
+    # Money is held in paise from here on; see finora/money.py
+    goal_amount = to_paise(st.number_input("Goal Amount (₹)", min_value=0.0, step=100.0, key="budget_goal"))
     goal_month = st.date_input("For Month", value=datetime.today().replace(day=1)).strftime('%Y-%m')
     if st.button("Set Budget Goal"):
         if goal_amount > 0:
             st.session_state['goals'][goal_month] = {'type': goal_type, 'amount': goal_amount}
-            st.success(f"{goal_type} goal of ₹{goal_amount} set for {goal_month}!")
+            st.success(f"{goal_type} goal of {format_inr(goal_amount)} set for {goal_month}!")
         else:
             st.warning("Please enter a valid goal amount.")
     
     # Emergency Fund Goal
     st.markdown("### 🛡️ Emergency Fund Goal")
-    emergency_goal = st.number_input("Emergency Fund Target (₹)", min_value=0.0, step=500.0, key="emergency_goal")
+    emergency_goal = to_paise(st.number_input("Emergency Fund Target (₹)", min_value=0.0, step=500.0, key="emergency_goal"))
     if st.button("Set Emergency Fund Goal"):
         if emergency_goal > 0:
             st.session_state['emergency_fund_goal'] = emergency_goal
-            st.success(f"Emergency fund goal set to ₹{emergency_goal}!")
+            st.success(f"Emergency fund goal set to {format_inr(emergency_goal)}!")
         else:
             st.warning("Please enter a valid emergency fund goal.")
 
+    # What-If Projection
+    from finora.projections import HORIZON_MONTHS, RETURN_OPTIONS, baseline_cash_flow, project, summarize_by_return
+    st.markdown("### 🔮 What-If Projection")
+    st.markdown("See how soon you could reach a goal if your income grows, you cut expenses or invest your savings.")
+    base_income, base_expense = baseline_cash_flow(aggregates, pd.Timestamp.now().to_period('M'))
+    if aggregates.empty():
+        st.info("Add income and expenses to project your goals.")
+    else:
+        goal_options = (["Emergency Fund"] if st.session_state['emergency_fund_goal'] > 0 else []) + ["Savings Target"]
+        projection_goal = st.selectbox("Goal to Project", goal_options, key="projection_goal")
+        if projection_goal == "Emergency Fund":
+            projection_target = st.session_state['emergency_fund_goal']
+            projection_start = aggregates.total('Income', category='income')
+        else:
+            projection_target = to_paise(st.number_input("Savings Target (₹)", min_value=0.0, value=50000.0, step=1000.0, key="projection_target"))
+            projection_start = max(aggregates.total('Income') - aggregates.total('Expense'), 0)
+        max_growth = st.slider("Income growth per year, up to (%)", 0, 30, 10, key="projection_growth")
+        max_cut = st.slider("Expense cut, up to (%)", 0, 50, 20, key="projection_cut")
+        # 11 x 11 growth/cut steps for every return option, simulated together
+        projection = project(base_income, base_expense, projection_target, projection_start,
+                             income_growth=np.linspace(0, max_growth / 100, 11), expense_cut=np.linspace(0, max_cut / 100, 11),
+                             annual_return=list(RETURN_OPTIONS.values()))
+        st.caption(f"Based on {format_inr(base_income, 0)} income and {format_inr(base_expense, 0)} expenses per month on average, "
+                   f"starting from {format_inr(projection_start, 0)}. {len(projection.scenarios)} scenarios over {HORIZON_MONTHS // 12} years.")
+
+        def months_label(months):
+            if pd.isna(months):
+                return f"Not within {HORIZON_MONTHS // 12} years"
+            return "Already reached" if months == 0 else f"{int(months)} months"
+        option_names = {rate: name for name, rate in RETURN_OPTIONS.items()}
+        projection_summary = summarize_by_return(projection)
+        st.dataframe(pd.DataFrame({
+            "Savings Option": projection_summary['annual_return'].map(option_names),
+            "As Things Are": projection_summary['as_is'].map(months_label),
+            "Best Case": projection_summary['best_case'].map(months_label),
+            "Median Scenario": projection_summary['median'].map(months_label),
+            "Scenarios Reaching Goal": (projection_summary['reachable_share'] * 100).round(0).astype(int).astype(str) + "%",
+        }), hide_index=True, use_container_width=True)
+
+        as_is = projection.scenarios.index[(projection.scenarios['income_growth'] == 0) & (projection.scenarios['expense_cut'] == 0)]
+        paths = pd.DataFrame({option_names[projection.scenarios.at[i, 'annual_return']]: rupees(projection.path(i)) for i in as_is})
+        paths["Goal"] = rupees(projection_target)
+        paths.index.name = "Month"
+        st.line_chart(paths)
+
 # -------------------- Add Entry --------------------
 if menu == "Add Entry":
+    profile.section("Add Entry")
     st.subheader("➕ Add Income or Expense")
     entry_type = st.selectbox("Type", ["Income", "Expense"])
-    amount = st.number_input("Amount", min_value=0.0, step=10.0)
+    amount = to_paise(st.number_input("Amount", min_value=0.0, step=10.0))
     if entry_type == "Expense":
         predefined_categories = ["Food", "Transport", "Entertainment", "Savings", "Education", "Rent", "Utilities", "Clothing", "Health", "Debt Repayment", "Other"]
         category = st.selectbox("Category", predefined_categories)
@@ -372,253 +389,183 @@ if menu == "Add Entry":
         elif amount <= 0:
             st.warning("Please enter a valid amount greater than 0.")
         else:
-            new_entry = pd.DataFrame([[st.session_state['username'], entry_type, amount, category, pd.to_datetime(entry_date)]],
-                                     columns=['Username', 'Type', 'Amount', 'Category', 'Date'])
-            st.session_state['data'] = pd.concat([data, new_entry], ignore_index=True)
-            st.session_state['data'].to_csv('user_data.csv', index=False)
+            record_entry(ledger, st.session_state['username'], entry_type, amount, category, entry_date)
+            sync_entry_xp()
             st.success("Entry added and saved successfully!")
 
 # -------------------- Dashboard --------------------
 elif menu == "Dashboard":
+    profile.section("Dashboard metrics")
+    from finora.charts import dashboard_charts
+    from finora.market import WATCHLIST, get_market_data, summarize
+    from finora.transactions import transaction_index
     st.subheader("📊 Dashboard")
     
     # Daily Check-In
+    # A fragment: checking in reruns only this panel, the streak shown below catches up on the next full rerun
+    @fragment
+    def daily_check_in():
+        with get_profiler().fragment("Daily Check-In", page=menu, user=st.session_state['username']):
+            today = datetime.today().date()
+            if st.session_state['last_check_in'] is None or pd.Timestamp(st.session_state['last_check_in']).date() != today:
+                if st.button("📅 Daily Check-In"):
+                    # Recorded once per day across sessions; the streak only moves if this one counts
+                    before = rewards.account(st.session_state['username'])
+                    xp_before, coins_before = before.xp, before.coins
+                    if award('check_in', 5, 2, key=today.isoformat()):
+                        last_check_in_date = pd.Timestamp(st.session_state['last_check_in']).date() if st.session_state['last_check_in'] is not None else None
+                        if last_check_in_date and (today - last_check_in_date).days == 1:
+                            st.session_state['check_in_streak'] += 1
+                        else:
+                            st.session_state['check_in_streak'] = 1
+                        st.session_state['last_check_in'] = today
+                        save_progress()
+                        st.success(f"Checked in! Current streak: {st.session_state['check_in_streak']} days "
+                                   f"(+{st.session_state['xp'] - xp_before} XP, +{st.session_state['coins'] - coins_before} Coins)")
+                    else:
+                        st.info("You've already checked in today.")
+
+    daily_check_in()
+    profile.section("Dashboard metrics")
     today = datetime.today().date()
-    if st.session_state['last_check_in'] is None or pd.Timestamp(st.session_state['last_check_in']).date() != today:
-        if st.button("📅 Daily Check-In"):
-            last_check_in_date = pd.Timestamp(st.session_state['last_check_in']).date() if st.session_state['last_check_in'] is not None else None
-            if last_check_in_date and (today - last_check_in_date).days == 1:
-                st.session_state['check_in_streak'] += 1
-            else:
-                st.session_state['check_in_streak'] = 1
-            st.session_state['last_check_in'] = today
-            st.session_state['xp'] += 5
-            st.session_state['coins'] += 2
-            save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                              st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                              st.session_state['last_check_in'], st.session_state['quests_completed'],
-                              st.session_state['quiz_score'])
-            st.success(f"Checked in! Current streak: {st.session_state['check_in_streak']} days (+5 XP, +2 Coins)")
 
     if user_data.empty:
         st.info("No data available. Add income and expenses to see dashboard.")
     else:
-        try:
-            user_data['Month'] = user_data['Date'].dt.to_period('M')
-        except Exception as e:
-            st.error(f"Failed to create Month column: {str(e)}. Please ensure Date column contains valid dates.")
-            st.stop()
         current_month = pd.Timestamp.now().to_period('M')
         last_month = current_month - 1
 
-        def get_summary(month):
-            df = user_data[user_data['Month'] == month]
-            income = df[df['Type'] == 'Income']['Amount'].sum()
-            expense = df[df['Type'] == 'Expense']['Amount'].sum()
-            return income, expense
-
-        income_cur, expense_cur = get_summary(current_month)
-        income_last, expense_last = get_summary(last_month)
+        income_cur, expense_cur = aggregates.month_totals(current_month)
+        income_last, expense_last = aggregates.month_totals(last_month)
         balance = income_cur - expense_cur
 
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("💸 Current Month Income", f"₹{income_cur:.2f}")
-            st.metric("📉 Current Month Expenses", f"₹{expense_cur:.2f}")
-            st.metric("🪙 Balance", f"₹{balance:.2f}")
+            st.metric("💸 Current Month Income", format_inr(income_cur))
+            st.metric("📉 Current Month Expenses", format_inr(expense_cur))
+            st.metric("🪙 Balance", format_inr(balance))
         with col2:
-            st.metric("🗓️ Last Month Income", f"₹{income_last:.2f}")
-            st.metric("🔻 Last Month Expenses", f"₹{expense_last:.2f}")
-            st.metric("📈 Growth", f"₹{(income_cur - income_last):.2f}")
+            st.metric("🗓️ Last Month Income", format_inr(income_last))
+            st.metric("🔻 Last Month Expenses", format_inr(expense_last))
+            st.metric("📈 Growth", format_inr(income_cur - income_last))
 
+        profile.section("Monthly Overview")
         st.markdown("### 📌 Monthly Overview")
-        summary = user_data.groupby(['Month', 'Type'])['Amount'].sum().unstack().fillna(0)
-        st.line_chart(summary)
+        # Built from the aggregate table and cached until this user's ledger changes
+        overview_chart, breakdown_chart = dashboard_charts(ledger, st.session_state['username'], current_month)
+        if overview_chart is not None:
+            st.plotly_chart(overview_chart, use_container_width=True)
 
+        profile.section("Expense Breakdown")
         st.markdown("### 🥧 Expense Breakdown")
-        expense_data = user_data[(user_data['Type'] == 'Expense') & (user_data['Month'] == current_month)]
-        if not expense_data.empty:
-            pie_data = expense_data.groupby('Category')['Amount'].sum()
-            if not pie_data.empty:
-                fig, ax = plt.subplots()
-                ax.pie(pie_data, labels=pie_data.index, autopct='%1.1f%%', colors=['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF'])
-                ax.axis('equal')
-                st.pyplot(fig)
-            else:
-                st.info("No expense data available for the current month.")
+        if breakdown_chart is not None:
+            st.plotly_chart(breakdown_chart, use_container_width=True)
         else:
             st.info("No expense data available for the current month.")
 
+        profile.section("Full Data")
         st.markdown("### 📋 Full Data")
-        st.dataframe(user_data[['Date', 'Type', 'Category', 'Amount']].sort_values(by='Date', ascending=False))
-
+        # Only the visible page is sent to the browser; filters run on the cached date-sorted index
+        transactions = transaction_index(ledger, st.session_state['username'])
+        first_date, last_date = transactions.date_bounds()
+        filter_col1, filter_col2, filter_col3 = st.columns([2, 1, 1])
+        with filter_col1:
+            date_range = st.date_input("Date Range", value=(first_date, last_date), min_value=first_date,
+                                       max_value=max(last_date, today), key="full_data_range")
+        with filter_col2:
+            type_filter = st.selectbox("Type", ["All"] + transactions.types, key="full_data_type")
+        with filter_col3:
+            category_filter = st.selectbox("Category", ["All"] + transactions.categories, key="full_data_category")
+        range_start = date_range[0] if len(date_range) > 0 else None
+        range_end = date_range[1] if len(date_range) > 1 else None
+        filters = dict(start=range_start, end=range_end,
+                       entry_type=None if type_filter == "All" else type_filter,
+                       category=None if category_filter == "All" else category_filter)
+        page_size = 25
+        total_rows = transactions.count(**filters)
+        page_count = max((total_rows + page_size - 1) // page_size, 1)
+        st.session_state['full_data_page'] = min(max(st.session_state.get('full_data_page', 1), 1), page_count)
+        page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="full_data_page")
+        page_rows, _ = transactions.page(page_number - 1, page_size, **filters)
+        st.dataframe(page_rows.assign(Amount=rupees(page_rows['Amount'])), hide_index=True, use_container_width=True)
+        shown_from = (page_number - 1) * page_size + 1 if total_rows else 0
+        st.caption(f"Showing {shown_from}-{min(page_number * page_size, total_rows)} of {total_rows} entries")
+
+        profile.section("Investment Suggestions")
         st.markdown("### 💡 Investment Suggestions")
-        if balance > 500:
+        if balance > 500 * PAISE:
             st.success("You have a surplus! Here are personalized investment ideas:")
             st.markdown("""
             **Recommended Allocation:**
-            - 💼 SIP (Mutual Fund): ₹{:.0f}
+            - 💼 SIP (Mutual Fund): {}
               - Example: Axis Bluechip Fund
-            - 🏦 Fixed Deposit (FD): ₹{:.0f}
+            - 🏦 Fixed Deposit (FD): {}
               - Example: HDFC FD at 7%
-            - 📱 Emergency Savings: ₹{:.0f}
+            - 📱 Emergency Savings: {}
               - Use a UPI wallet or recurring deposit
-            """.format(balance * 0.5, balance * 0.3, balance * 0.2))
+            """.format(format_inr(balance * 0.5, 0), format_inr(balance * 0.3, 0), format_inr(balance * 0.2, 0)))
         else:
             st.info("Try to reduce expenses or increase income to have an investable surplus.")
+        # Read from the local price cache; stale tickers refresh in the background
+        market_data = get_market_data()
+        market_trends = summarize(market_data.history(WATCHLIST), WATCHLIST)
+        if not market_trends.empty:
+            st.markdown("**Recent Market Trends**")
+            if market_data.sample:
+                st.caption("Sample data for demonstration only, not real market prices.")
+            st.dataframe(market_trends, hide_index=True, use_container_width=True)
 
         # -------------------- Gamification --------------------
+        profile.section("Gamification")
         st.markdown("### 🏅 Gamification Dashboard")
-        total_income = user_data[user_data['Type'] == 'Income']['Amount'].sum()
-        total_expense = user_data[user_data['Type'] == 'Expense']['Amount'].sum()
-        total_saved = total_income - total_expense
 
         # Financial Quests
         st.markdown("#### 🗺️ Financial Quests")
         st.markdown("Complete quests to earn rewards and improve your financial skills!")
-        quests = {
-            "Expense Tracker": {"task": "Log 5 expenses in a week", "xp": 30, "coins": 10},
-            "Savings Starter": {"task": "Save ₹2,000 in a month", "xp": 50, "coins": 20},
-            "Budget Builder": {"task": "Log entries for 10 days", "xp": 40, "coins": 15},
-            "Debt Crusher": {"task": "Pay off ₹1,000 in Debt Repayment", "xp": 40, "coins": 15},
-            "Category Explorer": {"task": "Use 3 new categories in a month", "xp": 25, "coins": 10},
-            "Consistency Star": {"task": "Log entries every day for 5 days in a week", "xp": 35, "coins": 12}
-        }
-        week_start = today - timedelta(days=today.weekday())
-        recent_expenses = user_data[(user_data['Type'] == 'Expense') & (user_data['Date'].dt.date >= week_start)]
-        unique_days = user_data['Date'].dt.date.nunique() if pd.api.types.is_datetime64_any_dtype(user_data['Date']) else 0
-        debt_payments = user_data[(user_data['Type'] == 'Expense') & (user_data['Category'] == 'Debt Repayment')]['Amount'].sum() if not user_data.empty else 0
-        current_month_categories = user_data[user_data['Month'] == current_month]['Category'].nunique() if not user_data.empty else 0
-        week_days_logged = len(user_data[(user_data['Date'].dt.date >= week_start) & (user_data['Date'].dt.date <= today)]['Date'].dt.date.unique()) if not user_data.empty else 0
-        
-        for quest_name, quest_info in quests.items():
-            if quest_name not in st.session_state['quests_completed']:
-                if quest_name == "Expense Tracker" and len(recent_expenses) >= 5:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                elif quest_name == "Savings Starter" and balance >= 2000:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                elif quest_name == "Budget Builder" and unique_days >= 10:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                elif quest_name == "Debt Crusher" and debt_payments >= 1000:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                elif quest_name == "Category Explorer" and current_month_categories >= 3:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                elif quest_name == "Consistency Star" and week_days_logged >= 5:
-                    st.session_state['quests_completed'].append(quest_name)
-                    st.session_state['xp'] += quest_info['xp']
-                    st.session_state['coins'] += quest_info['coins']
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest_info['xp']} XP and {quest_info['coins']} coins!")
-                else:
-                    st.info(f"Quest: {quest_name} - {quest_info['task']} (Reward: {quest_info['xp']} XP, {quest_info['coins']} coins)")
+        quests = QUESTS
+        streaks = compute_streaks(transactions, aggregates.monthly_net(), today)
+        features = extract_features(transactions, aggregates, streaks, current_month,
+                                    st.session_state['check_in_streak'], st.session_state['emergency_fund_goal'])
+        unique_days = features['unique_days']
+
+        completed_now = new_quest_completions(features, st.session_state['quests_completed'])
+        for quest in completed_now:
+            st.session_state['quests_completed'].append(quest.name)
+            award('quest', quest.xp, quest.coins, key=quest.name)
+        for quest_name, quest in quests.items():
+            if quest in completed_now:
+                st.success(f"🎉 Quest Completed: {quest_name}! Earned {quest.xp} XP and {quest.coins} coins!")
+            elif quest_name not in st.session_state['quests_completed']:
+                st.info(f"Quest: {quest_name} - {quest.task} (Reward: {quest.xp} XP, {quest.coins} coins)")
 
         # Achievements
         st.markdown("#### 🎖️ Achievements")
         st.markdown("Earn badges by managing your finances wisely!")
         achievements = []
-        if total_saved >= 1000:
-            achievements.append(("Budget Beginner", "Saved ₹1,000", "You've started building a savings habit!", datetime.now()))
-            st.success("💸 **Budget Beginner** - Saved ₹1,000 (Meaning: You've started building a savings habit!)")
-        if total_saved >= 5000:
-            achievements.append(("Smart Saver", "Saved ₹5,000", "You're prioritizing financial security!", datetime.now()))
-            st.success("🎯 **Smart Saver** - Saved ₹5,000 (Meaning: You're prioritizing financial security!)")
-        if total_saved >= 10000:
-            achievements.append(("Wealth Warrior", "Saved ₹10,000", "You're on the path to wealth creation!", datetime.now()))
-            st.success("🏆 **Wealth Warrior** - Saved ₹10,000 (Meaning: You're on the path to wealth creation!)")
-        if len(user_data) >= 10:
-            achievements.append(("Consistency Champ", "10+ entries logged", "Consistent tracking is key to financial awareness!", datetime.now()))
-            st.info("🗂️ **Consistency Champ** - 10+ entries logged (Meaning: Consistent tracking is key to financial awareness!)")
-        if user_data['Category'].nunique() >= 5:
-            achievements.append(("Diverse Tracker", "5+ unique categories", "You're understanding your spending patterns!", datetime.now()))
-            st.info("🎨 **Diverse Tracker** - 5+ unique categories (Meaning: You're understanding your spending patterns!)")
-        if user_data['Category'].nunique() >= 10:
-            achievements.append(("Category Master", "10+ unique categories", "You're mastering comprehensive budgeting!", datetime.now()))
-            st.info("🌈 **Category Master** - 10+ unique categories (Meaning: You're mastering comprehensive budgeting!)")
+
+        def show_achievements(group):
+            for badge in evaluate([a for a in ACHIEVEMENTS if a.group == group], features):
+                achievements.append((badge.name, badge.description, badge.meaning, datetime.now()))
+                getattr(st, badge.style)(f"{badge.icon} **{badge.name}** - {badge.message} (Meaning: {badge.meaning})")
+
+        show_achievements('savings')
 
         # Logging Streak
         st.markdown("#### 🔥 Logging Streak")
         st.markdown("Log entries regularly to build a budgeting habit!")
-        if pd.api.types.is_datetime64_any_dtype(user_data['Date']) and not user_data.empty:
-            user_data['DateOnly'] = user_data['Date'].dt.date
-            unique_days = user_data['DateOnly'].nunique()
+        if unique_days > 0:
             st.info(f"📆 You've added entries on **{unique_days}** days!")
-            if unique_days >= 3:
-                achievements.append(("3-Day Streak", "Logged entries for 3 days", "Early consistency builds strong habits.", datetime.now()))
-                st.success("🔥 **3-Day Streak** - Keep logging daily! (Meaning: Early consistency builds strong habits.)")
-            if unique_days >= 7:
-                achievements.append(("1-Week Streak", "Logged entries for 7 days", "You're forming a routine.", datetime.now()))
-                st.success("🚀 **1-Week Streak** - One week strong! (Meaning: You're forming a routine.)")
-            if unique_days >= 14:
-                achievements.append(("2-Week Streak", "Logged entries for 14 days", "You're committed to financial tracking.", datetime.now()))
-                st.success("🌟 **2-Week Streak** - Impressive dedication! (Meaning: You're committed to financial tracking.)")
-            if unique_days >= 21:
-                achievements.append(("3-Week Streak", "Logged entries for 21 days", "Long-term habits lead to success.", datetime.now()))
-                st.success("⚡ **3-Week Streak** - Unstoppable! (Meaning: Long-term habits lead to success.)")
-            if unique_days >= 30:
-                achievements.append(("1-Month Consistency Hero", "Logged entries for 30 days", "You've built a solid foundation.", datetime.now()))
-                st.success("🏅 **1-Month Consistency Hero** - A true budgeting pro! (Meaning: You've built a solid foundation.)")
-            if unique_days >= 60:
-                achievements.append(("2-Month Legend", "Logged entries for 60 days", "Your discipline is inspiring.", datetime.now()))
-                st.success("👑 **2-Month Legend** - A budgeting legend! (Meaning: Your discipline is inspiring.)")
+            show_achievements('logging')
         else:
             st.info("Start adding entries to track your logging streak.")
 
         # Savings Streak
         st.markdown("#### 💰 Savings Streak")
         st.markdown("Maintain positive balances monthly to grow your wealth!")
-        if not user_data.empty:
-            monthly_balances = user_data.groupby('Month').apply(lambda x: x[x['Type'] == 'Income']['Amount'].sum() - x[x['Type'] == 'Expense']['Amount'].sum())
-            savings_streak = 0
-            for month in sorted(monthly_balances.index, reverse=True):
-                if monthly_balances[month] > 0:
-                    savings_streak += 1
-                else:
-                    break
+        savings_streak = features['savings_streak']
+        if not aggregates.empty():
             st.info(f"📈 You've maintained a positive balance for **{savings_streak}** consecutive months!")
-            if savings_streak >= 2:
-                achievements.append(("Savings Sprout", "2+ months of positive balance", "Consistent saving builds wealth.", datetime.now()))
-                st.success("🌱 **Savings Sprout** - 2+ months of positive balance! (Meaning: Consistent saving builds wealth.)")
-            if savings_streak >= 4:
-                achievements.append(("Savings Tree", "4+ months of positive balance", "Your savings are growing strong.", datetime.now()))
-                st.success("🌳 **Savings Tree** - 4+ months of positive balance! (Meaning: Your savings are growing strong.)")
+            show_achievements('savings_streak')
         else:
             st.info("Start adding entries to track your savings streak!")
 
@@ -626,30 +573,17 @@ elif menu == "Dashboard":
         st.markdown("#### 📅 Daily Check-In Streak")
         st.markdown("Check in daily to stay on top of your finances!")
         st.info(f"🔄 Current check-in streak: **{st.session_state['check_in_streak']}** days")
-        if st.session_state['check_in_streak'] >= 3:
-            achievements.append(("3-Day Check-In Streak", "Checked in for 3 days", "Regular monitoring keeps you in control.", datetime.now()))
-            st.success("🌟 **3-Day Check-In Streak** - Great daily engagement! (Meaning: Regular monitoring keeps you in control.)")
-        if st.session_state['check_in_streak'] >= 7:
-            achievements.append(("7-Day Check-In Streak", "Checked in for 7 days", "You're mastering daily financial awareness.", datetime.now()))
-            st.success("🚀 **7-Day Check-In Streak** - Amazing consistency! (Meaning: You're mastering daily financial awareness.)")
+        show_achievements('check_in')
 
         # Emergency Fund Tracker
         st.markdown("#### 🛡️ Emergency Fund Tracker")
         st.markdown("Build a safety net for unexpected expenses!")
-        emergency_savings = user_data[(user_data['Type'] == 'Income') & (user_data['Category'].str.lower() == 'income')]['Amount'].sum() if not user_data.empty else 0
+        emergency_savings = features['emergency_savings']
         if st.session_state['emergency_fund_goal'] > 0:
-            progress = min(emergency_savings / st.session_state['emergency_fund_goal'], 1.0)
+            progress = features['emergency_progress']
             st.progress(progress)
-            st.info(f"🛡️ Emergency Fund: ₹{emergency_savings:.2f} / ₹{st.session_state['emergency_fund_goal']:.2f} ({progress*100:.1f}%)")
-            if progress >= 0.25:
-                achievements.append(("Quarter Funded", "25% of emergency fund goal", "You're building a safety net.", datetime.now()))
-                st.success("🏦 **Quarter Funded** - 25% of emergency fund goal! (Meaning: You're building a safety net.)")
-            if progress >= 0.5:
-                achievements.append(("Half Funded", "50% of emergency fund goal", "Your financial security is growing.", datetime.now()))
-                st.success("🏧 **Half Funded** - 50% of emergency fund goal! (Meaning: Your financial security is growing.)")
-            if progress >= 1.0:
-                achievements.append(("Fully Funded", "Emergency fund goal achieved", "You're prepared for the unexpected.", datetime.now()))
-                st.success("🎉 **Fully Funded** - Emergency fund goal achieved! (Meaning: You're prepared for the unexpected.)")
+            st.info(f"🛡️ Emergency Fund: {format_inr(emergency_savings)} / {format_inr(st.session_state['emergency_fund_goal'])} ({progress*100:.1f}%)")
+            show_achievements('emergency_fund')
         else:
             st.info("Set an emergency fund goal in the 'Set Goals' tab!")
 
@@ -662,19 +596,19 @@ elif menu == "Dashboard":
             if goal['type'] == 'Savings':
                 progress = min(balance / goal['amount'], 1.0)
                 st.progress(progress)
-                st.info(f"💪 Savings Goal for {current_month_str}: ₹{balance:.2f} / ₹{goal['amount']} ({progress*100:.1f}%)")
+                st.info(f"💪 Savings Goal for {current_month_str}: {format_inr(balance)} / {format_inr(goal['amount'])} ({progress*100:.1f}%)")
                 if balance >= goal['amount']:
-                    achievements.append(("Goal Achiever", f"Met ₹{goal['amount']} savings goal", "You're hitting your financial targets!", datetime.now()))
-                    st.success(f"🎉 **Goal Achiever** - Met ₹{goal['amount']} savings goal for {current_month_str}! (Meaning: You're hitting your financial targets!)")
+                    achievements.append(("Goal Achiever", f"Met {format_inr(goal['amount'])} savings goal", "You're hitting your financial targets!", datetime.now()))
+                    st.success(f"🎉 **Goal Achiever** - Met {format_inr(goal['amount'])} savings goal for {current_month_str}! (Meaning: You're hitting your financial targets!)")
                 else:
                     st.info(f"Keep saving to reach your goal!")
             elif goal['type'] == 'Spending Limit':
                 progress = max(1.0 - (expense_cur / goal['amount']), 0.0)
                 st.progress(progress)
-                st.info(f"💪 Spending Limit for {current_month_str}: ₹{expense_cur:.2f} / ₹{goal['amount']} ({progress*100:.1f}% under limit)")
+                st.info(f"💪 Spending Limit for {current_month_str}: {format_inr(expense_cur)} / {format_inr(goal['amount'])} ({progress*100:.1f}% under limit)")
                 if expense_cur <= goal['amount']:
-                    achievements.append(("Spending Master", f"Kept expenses under ₹{goal['amount']}", "You're controlling your spending!", datetime.now()))
-                    st.success(f"🎉 **Spending Master** - Kept expenses under ₹{goal['amount']} for {current_month_str}! (Meaning: You're controlling your spending!)")
+                    achievements.append(("Spending Master", f"Kept expenses under {format_inr(goal['amount'])}", "You're controlling your spending!", datetime.now()))
+                    st.success(f"🎉 **Spending Master** - Kept expenses under {format_inr(goal['amount'])} for {current_month_str}! (Meaning: You're controlling your spending!)")
                 else:
                     st.info(f"Try to cut back to meet your spending limit!")
         else:
@@ -688,18 +622,15 @@ elif menu == "Dashboard":
             for name, desc, meaning, date in achievements:
                 st.markdown(f"- 🏆 **{name}** ({desc}) - *{meaning}* (Earned: {date.strftime('%Y-%m-%d')})")
             for quest in st.session_state['quests_completed']:
-                st.markdown(f"- 🗺️ **{quest}** ({quests[quest]['task']}) - *Earned {quests[quest]['xp']} XP and {quests[quest]['coins']} coins!* (Earned: {datetime.now().strftime('%Y-%m-%d')})")
+                st.markdown(f"- 🗺️ **{quest}** ({quests[quest].task}) - *Earned {quests[quest].xp} XP and {quests[quest].coins} coins!* (Earned: {datetime.now().strftime('%Y-%m-%d')})")
         else:
             st.info("Start earning badges by completing quests and achieving financial milestones!")
 
         # Peer Comparison Rank
+        profile.section("Peer Rank")
         st.markdown("#### 🏅 Peer Comparison Rank")
         st.markdown("See how you stack up against other budgeters!")
-        total_users = len(data['Username'].unique()) if not data.empty else 1
-        user_xp = st.session_state['xp']
-        peer_xps = [user_xp] + [random.randint(50, 500) for _ in range(total_users - 1)]
-        rank = sum(1 for peer_xp in peer_xps if peer_xp > user_xp) + 1
-        percentile = (1 - rank / total_users) * 100
+        rank, total_users, percentile = get_leaderboard().rank('xp', st.session_state['xp'], st.session_state['username'])
         if percentile >= 90:
             achievements.append(("Top 10% Budgeter", f"Rank {rank}/{total_users}", "You're among the best savers!", datetime.now()))
             st.success(f"🌟 **Top 10% Budgeter** - Rank {rank}/{total_users}! (Meaning: You're among the best savers!)")
@@ -710,42 +641,11 @@ elif menu == "Dashboard":
             st.info(f"📈 Rank {rank}/{total_users} ({percentile:.1f}% percentile). Keep budgeting to climb the ranks!")
 
         # XP and Levels
-        def calculate_xp(data):
-            if data.empty:
-                return st.session_state['xp']
-            income_entries = data[data['Type'] == 'Income'].shape[0]
-            expense_entries = data[data['Type'] == 'Expense'].shape[0]
-            xp = (income_entries * 5) + (expense_entries * 3)
-            if current_month_str in st.session_state['goals']:
-                goal = st.session_state['goals'][current_month_str]
-                if goal['type'] == 'Savings' and balance >= goal['amount']:
-                    xp += 50
-                elif goal['type'] == 'Spending Limit' and expense_cur <= goal['amount']:
-                    xp += 50
-            if unique_days >= 7:
-                xp += 20
-            if unique_days >= 30:
-                xp += 50
-            if savings_streak >= 2:
-                xp += 30
-            if st.session_state['check_in_streak'] >= 3:
-                xp += 10
-            if st.session_state['check_in_streak'] >= 7:
-                xp += 20
-            if emergency_savings >= st.session_state['emergency_fund_goal'] * 0.5:
-                xp += 30
-            if emergency_savings >= st.session_state['emergency_fund_goal']:
-                xp += 50
-            for quest_name in st.session_state['quests_completed']:
-                xp += quests[quest_name]['xp']
-            xp += st.session_state['quiz_score'] * 5
-            return xp
-
-        st.session_state['xp'] = calculate_xp(user_data)
-        save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                          st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                          st.session_state['last_check_in'], st.session_state['quests_completed'],
-                          st.session_state['quiz_score'])
+        profile.section("XP & Rewards")
+        # Only milestones that changed since the last render are written
+        if rewards.sync_milestones(st.session_state['username'], milestone_status(
+                features, st.session_state['goals'].get(current_month_str), current_month_str)):
+            refresh_balance()
         level = st.session_state['xp'] // 100 + 1
         next_level_xp = (level * 100) - st.session_state['xp']
         st.markdown(f"#### 🎮 Level: {level}")
@@ -753,42 +653,48 @@ elif menu == "Dashboard":
         st.caption(f"⭐ {st.session_state['xp']} XP - {next_level_xp} XP to next level!")
 
         # Coins and Redemption
-        st.session_state['coins'] = st.session_state['xp'] // 10 + sum(quests[quest]['coins'] for quest in st.session_state['quests_completed'])
         st.sidebar.markdown(f"💰 Coins Earned: **{st.session_state['coins']}**")
-        st.markdown("#### 🏪 Coin Redemption")
-        st.markdown("Redeem coins for virtual rewards to enhance your financial knowledge!")
-        available_rewards = {
-            "Advanced Financial Tips": {"cost": 100, "description": "Unlock expert budgeting strategies."},
-            "Investment Guide": {"cost": 150, "description": "Learn about mutual funds and stocks."},
-            "Savings Master Badge": {"cost": 200, "description": "Earn a prestigious badge for your profile."}
-        }
-        selected_reward = st.selectbox("Choose a Reward", [""] + list(available_rewards.keys()))
-        if st.button("Redeem Reward") and selected_reward:
-            if selected_reward in available_rewards:
-                cost = available_rewards[selected_reward]["cost"]
-                if st.session_state['coins'] >= cost and selected_reward not in st.session_state['redeemed_rewards']:
-                    st.session_state['redeemed_rewards'].append(selected_reward)
-                    st.session_state['coins'] -= cost
-                    save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                                      st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                                      st.session_state['last_check_in'], st.session_state['quests_completed'],
-                                      st.session_state['quiz_score'])
-                    st.success(f"🎁 Redeemed: {selected_reward}! {available_rewards[selected_reward]['description']}")
-                elif selected_reward in st.session_state['redeemed_rewards']:
-                    st.error("You've already redeemed this reward.")
-                else:
-                    st.warning(f"You need {cost - st.session_state['coins']} more coins to redeem {selected_reward}.")
-            else:
-                st.error("Please select a valid reward.")
+        # Choosing and redeeming a reward reruns only this panel
+        @fragment
+        def coin_redemption():
+            with get_profiler().fragment("Coin Redemption", page=menu, user=st.session_state['username']):
+                st.markdown("#### 🏪 Coin Redemption")
+                st.markdown("Redeem coins for virtual rewards to enhance your financial knowledge!")
+                available_rewards = {
+                    "Advanced Financial Tips": {"cost": 100, "description": "Unlock expert budgeting strategies."},
+                    "Investment Guide": {"cost": 150, "description": "Learn about mutual funds and stocks."},
+                    "Savings Master Badge": {"cost": 200, "description": "Earn a prestigious badge for your profile."}
+                }
+                selected_reward = st.selectbox("Choose a Reward", [""] + list(available_rewards.keys()))
+                if st.button("Redeem Reward") and selected_reward:
+                    if selected_reward in available_rewards:
+                        cost = available_rewards[selected_reward]["cost"]
+                        if selected_reward in st.session_state['redeemed_rewards']:
+                            st.error("You've already redeemed this reward.")
+                        elif st.session_state['coins'] >= cost:
+                            # Charged first; the reward is only granted if the charge was recorded
+                            if award('redemption', coins=-cost, key=selected_reward):
+                                st.session_state['redeemed_rewards'].append(selected_reward)
+                                save_progress()
+                                st.success(f"🎁 Redeemed: {selected_reward}! {available_rewards[selected_reward]['description']}")
+                            else:
+                                st.error("You've already redeemed this reward.")
+                        else:
+                            st.warning(f"You need {cost - st.session_state['coins']} more coins to redeem {selected_reward}.")
+                    else:
+                        st.error("Please select a valid reward.")
+
+                # Display Redeemed Rewards
+                if st.session_state['redeemed_rewards']:
+                    st.markdown("#### 🏆 Your Redeemed Rewards")
+                    for reward in st.session_state['redeemed_rewards']:
+                        st.info(f"🎉 {reward}: {available_rewards[reward]['description']}")
 
-        # Display Redeemed Rewards
-        if st.session_state['redeemed_rewards']:
-            st.markdown("#### 🏆 Your Redeemed Rewards")
-            for reward in st.session_state['redeemed_rewards']:
-                st.info(f"🎉 {reward}: {available_rewards[reward]['description']}")
+        coin_redemption()
 
 # -------------------- Financial Education --------------------
 elif menu == "Financial Education":
+    profile.section("Financial Education")
     st.subheader("📚 Financial Education")
     st.markdown("### 🧠 Tips & Tricks")
     st.markdown("""
@@ -827,54 +733,95 @@ elif menu == "Financial Education":
         {"question": "What is a mutual fund?", "options": ["A single stock", "A diversified investment pool", "A fixed deposit"], "correct": 1},
         {"question": "Why is an emergency fund important?", "options": ["To buy luxury items", "To cover unexpected expenses", "To invest in stocks"], "correct": 1}
     ]
-    if st.button("Start Quiz"):
-        st.session_state['quiz_score'] = 0
-        for i, q in enumerate(quiz_questions):
-            st.markdown(f"**Question {i+1}: {q['question']}**")
-            answer = st.radio("Select an answer:", q['options'], key=f"quiz_{i}")
-            if st.button("Submit Answer", key=f"submit_{i}"):
-                if q['options'].index(answer) == q['correct']:
-                    st.session_state['quiz_score'] += 1
-                    st.success("Correct! +1 point")
+
+    # The quiz buttons and radios rerun only the quiz
+    @fragment
+    def financial_quiz():
+        with get_profiler().fragment("Financial Quiz", page=menu, user=st.session_state['username']):
+            if st.button("Start Quiz"):
+                st.session_state['quiz_score'] = 0
+                for i, q in enumerate(quiz_questions):
+                    st.markdown(f"**Question {i+1}: {q['question']}**")
+                    answer = st.radio("Select an answer:", q['options'], key=f"quiz_{i}")
+                    if st.button("Submit Answer", key=f"submit_{i}"):
+                        if q['options'].index(answer) == q['correct']:
+                            st.session_state['quiz_score'] += 1
+                            st.success("Correct! +1 point")
+                        else:
+                            st.error("Incorrect. Try again next time!")
+                # Only a new best score earns XP, for the points it adds
+                earned = rewards.raise_quiz(st.session_state['username'], st.session_state['quiz_score'] * 5)
+                if earned:
+                    refresh_balance()
                 else:
-                    st.error("Incorrect. Try again next time!")
-        st.session_state['xp'] += st.session_state['quiz_score'] * 5
-        save_user_progress(st.session_state['username'], st.session_state['xp'], st.session_state['coins'],
-                          st.session_state['redeemed_rewards'], st.session_state['check_in_streak'],
-                          st.session_state['last_check_in'], st.session_state['quests_completed'],
-                          st.session_state['quiz_score'])
-        st.info(f"Quiz Score: {st.session_state['quiz_score']}/3 (Earned {st.session_state['quiz_score'] * 5} XP)")
-        peer_scores = [st.session_state['quiz_score']] + [random.randint(0, 3) for _ in range(9)]
-        quiz_rank = sum(1 for score in peer_scores if score > st.session_state['quiz_score']) + 1
-        st.metric("Quiz Leaderboard Rank", f"{quiz_rank}/10")
+                    save_progress()
+                st.info(f"Quiz Score: {st.session_state['quiz_score']}/3 (Earned {earned} XP)")
+                quiz_rank, quiz_total, _ = get_leaderboard().rank('quiz', st.session_state['quiz_score'], st.session_state['username'])
+                st.metric("Quiz Leaderboard Rank", f"{quiz_rank}/{quiz_total}")
+
+    financial_quiz()
 
 # -------------------- Upload & Download --------------------
-st.sidebar.file_uploader("Upload CSV", type="csv", key="file_uploader")
-if st.session_state.get('file_uploader'):
-    uploaded_file = st.session_state['file_uploader']
-    try:
-        uploaded_data = pd.read_csv(uploaded_file, parse_dates=['Date'])
-        if all(col in uploaded_data.columns for col in ['Username', 'Type', 'Amount', 'Category', 'Date']):
-            if pd.api.types.is_datetime64_any_dtype(uploaded_data['Date']):
-                uploaded_data = uploaded_data[uploaded_data['Username'] == st.session_state['username']]
-                if not uploaded_data.empty:
-                    non_user_data = data[data['Username'] != st.session_state['username']]
-                    st.session_state['data'] = pd.concat([non_user_data, uploaded_data], ignore_index=True)
-                    st.session_state['data'].to_csv('user_data.csv', index=False)
-                    st.success("Data uploaded successfully for your account!")
-                else:
-                    st.error("No data in the uploaded CSV matches your username.")
+def import_upload(uploaded_file):
+    from finora.importer import ImportRejected, content_hash, import_csv
+    # Each file is imported once per session; reruns while the uploader still holds it reuse the outcome
+    results = st.session_state.setdefault('upload_results', {})
+    if uploaded_file.file_id not in results:
+        digest = content_hash(uploaded_file)
+        if digest not in results:
+            progress_bar = st.progress(0.0, text="Importing CSV...")
+            try:
+                result = import_csv(ledger, st.session_state['username'], uploaded_file,
+                                    progress=lambda done: progress_bar.progress(done, text="Importing CSV..."))
+                sync_entry_xp()
+                results[digest] = ('success', result.summary())
+            except ImportRejected as e:
+                results[digest] = ('error', str(e))
+            except Exception as e:
+                results[digest] = ('error', f"Failed to process uploaded CSV: {str(e)}")
+            progress_bar.empty()
+        results[uploaded_file.file_id] = results[digest]
+    return results[uploaded_file.file_id]
+
+# Uploading, picking a format and downloading rerun only the sidebar panel; a new
+# import reruns the whole page so it shows the imported entries
+@fragment
+def data_transfer():
+    with get_profiler().fragment("Upload & Download", page=menu, user=st.session_state['username']):
+        from finora.export import EXPORT_FORMATS, available_formats, build_export, cached_export
+        uploaded_file = st.file_uploader("Upload CSV", type="csv", key="file_uploader")
+        if uploaded_file is not None:
+            imported = uploaded_file.file_id not in st.session_state.get('upload_results', {})
+            status, message = import_upload(uploaded_file)
+            if status == 'success':
+                if imported:
+                    st.rerun()
+                st.success(message)
             else:
-                st.error("Date column in uploaded CSV is not in a valid datetime format.")
-        else:
-            st.error("Uploaded CSV must contain columns: Username, Type, Amount, Category, Date")
-    except Exception as e:
-        st.error(f"Failed to process uploaded CSV: {str(e)}")
+                st.error(message)
+
+        # The payload is only encoded on request and reused until the ledger changes
+        export_format = st.selectbox("Download format", available_formats(),
+                                     format_func=lambda name: EXPORT_FORMATS[name].label, key="export_format")
+        export = cached_export(ledger, st.session_state['username'], export_format)
+        if export is None and st.button("Prepare Download"):
+            export = build_export(ledger, st.session_state['username'], export_format)
+        if export is not None:
+            st.download_button("Download My Data", export.payload, export.filename, export.mime)
 
-user_csv = user_data.to_csv(index=False).encode('utf-8')
-st.sidebar.download_button("Download My Data", user_csv, f"{st.session_state['username']}_budget_data.csv", "text/csv")
+with st.sidebar:
+    data_transfer()
 
 
  
   
 
+# -------------------- Render Profile --------------------
+render_record = finish_profile(menu)
+if is_admin(st.session_state['username']):
+    with st.sidebar.expander("⏱️ Render Profile"):
+        st.caption(f"Last rerun: {render_record['total_ms']:.0f} ms, {render_record['reads']} file reads, "
+                   f"{render_record['writes']} file writes, {render_record['sql_reads'] + render_record['sql_writes']} SQL statements")
+        st.dataframe(profile.table())
+        st.markdown("**Recent reruns**")
+        st.dataframe(get_profiler().summary())
@@ -0,0 +1 @@
+# Standalone performance benchmarks; run each with python -m benchmarks.<name>
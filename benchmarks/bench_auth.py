@@ -0,0 +1,59 @@
+# -------------------- Login Throughput Benchmark --------------------
+# Measures password verifications per second for each work-factor profile,
+# on one thread and through the auth pool, and reports logins/sec per core.
+#
+#   python -m benchmarks.bench_auth
+#   python -m benchmarks.bench_auth --profiles standard strong --workers 4 --logins 64
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import pbkdf2_sha256
+
+from finora.auth import WORK_FACTORS, Hasher
+
+
+def measure(hasher, stored_hash, logins):
+    start = time.perf_counter()
+    for _ in range(logins):
+        hasher.verify('correct horse', stored_hash)
+    return logins / (time.perf_counter() - start)
+
+
+def measure_concurrent(hasher, stored_hash, logins):
+    # One caller thread per login, like simultaneous Streamlit sessions
+    with ThreadPoolExecutor(max_workers=logins) as callers:
+        start = time.perf_counter()
+        results = list(callers.map(lambda _: hasher.verify('correct horse', stored_hash), range(logins)))
+        elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password verification throughput per work-factor profile")
+    parser.add_argument('--profiles', nargs='+', default=list(WORK_FACTORS), choices=list(WORK_FACTORS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--logins', type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'rounds':>8} {'1 thread/s':>11} {f'{args.workers} workers/s':>13} {'per core/s':>11}")
+    for profile in args.profiles:
+        rounds = WORK_FACTORS[profile]
+        stored_hash = pbkdf2_sha256.using(rounds=rounds).hash('correct horse')
+        # Fewer samples for expensive profiles so the run stays short
+        logins = max(4, args.logins * WORK_FACTORS['standard'] // rounds)
+        single = Hasher(rounds=rounds, workers=1, max_pending=logins)
+        pooled = Hasher(rounds=rounds, workers=args.workers, max_pending=logins)
+        try:
+            serial_rate = measure(single, stored_hash, logins)
+            pooled_rate = measure_concurrent(pooled, stored_hash, logins)
+        finally:
+            single.close()
+            pooled.close()
+        print(f"{profile:<10} {rounds:>8} {serial_rate:>11.1f} {pooled_rate:>13.1f} {pooled_rate / args.workers:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# -------------------- Core Path Benchmark --------------------
+# Generates a synthetic dataset (see benchmarks/synthetic.py) in a scratch
+# directory and times the app's core paths headlessly against it: login
+# verification, ledger open and load, per-user date filtering, dashboard
+# aggregates, the date-sorted transaction index, streaks, the rewards ledger
+# (opening, awards, milestone checks, balance reads), progress saves and CSV
+# upload.
+# Each path reports p50/p95/p99/max latency over `--samples` users and the
+# peak Python memory of one traced call. --save writes the results as JSON
+# and --baseline compares a run against a saved one.
+#
+#   python -m benchmarks.bench_core --users 1000 --transactions 500 --save before.json
+#   python -m benchmarks.bench_core --users 1000 --transactions 500 --baseline before.json
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import PASSWORD, generate, write_upload
+
+
+def run_path(name, fn, args, results):
+    """Time fn(arg) for every arg, then trace one extra call for peak memory."""
+    timings = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn(args[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ms = np.array(timings)
+    results[name] = {
+        'calls': len(timings),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(args):
+    # The stores resolve their files relative to the working directory
+    os.environ['FINORA_STORAGE'] = args.storage
+    os.environ['FINORA_LEDGER_FORMAT'] = args.format
+    os.environ.setdefault('FINORA_AUTH_PROFILE', 'standard')
+    workdir = tempfile.mkdtemp(prefix='finora-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        generate('.', args.users, args.transactions, args.months, args.seed)
+        return run_paths(args)
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_paths(args):
+    # Imported after the environment is set up; the singletons read it on first use
+    from finora.aggregates import MonthlyAggregates
+    from finora.auth import verify_user
+    from finora.cache import datasets
+    from finora.importer import import_csv
+    from finora.ledger import get_ledger
+    from finora.money import PAISE
+    from finora.progress import get_progress_store, normalize_record
+    from finora.rewards import get_rewards
+    from finora.rules import entry_xp, extract_features, milestone_status
+    from finora.streaks import compute_streaks
+    from finora.transactions import TransactionIndex
+
+    rng = random.Random(args.seed)
+    sample = rng.sample([f"user{i:06d}" for i in range(args.users)], min(args.samples, args.users))
+    today = pd.Timestamp.today().date()
+    current_month = pd.Timestamp.now().to_period('M')
+    results = {}
+
+    start = time.perf_counter()
+    ledger = get_ledger()
+    ledger.user_count()
+    results['ledger_open'] = {'calls': 1, 'p50_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    run_path('login_verify', lambda user: verify_user(user, PASSWORD), sample[:args.logins], results)
+
+    def cold_load(user):
+        datasets.invalidate()
+        ledger.load_user(user)
+    run_path('ledger_load_cold', cold_load, sample, results)
+    for user in sample:
+        ledger.load_user(user)
+    run_path('ledger_load_warm', ledger.load_user, sample, results)
+
+    month_start = (current_month - 2).start_time
+    run_path('ledger_filter_3_months', lambda user: ledger.load_user(user, start=month_start), sample, results)
+
+    frames = {user: ledger.load_user(user) for user in sample}
+    aggregates = {}
+
+    def dashboard(user):
+        agg = aggregates[user] = MonthlyAggregates.from_ledger(frames[user])
+        agg.month_totals(current_month)
+        agg.month_totals(current_month - 1)
+        agg.by_month_type()
+        agg.category_breakdown(current_month)
+    run_path('dashboard_aggregates', dashboard, sample, results)
+
+    indexes = {}
+
+    def index(user):
+        indexes[user] = TransactionIndex(frames[user])
+    run_path('transaction_index', index, sample, results)
+
+    streaks = {}
+
+    def streak(user):
+        streaks[user] = compute_streaks(indexes[user], aggregates[user].monthly_net(), today)
+    run_path('streaks', streak, sample, results)
+
+    features = {user: extract_features(indexes[user], aggregates[user], streaks[user], current_month, 3, 5000 * PAISE)
+                for user in sample}
+    goal = {'type': 'Savings', 'amount': 2000 * PAISE}
+    rewards = get_rewards()
+    run_path('rewards_open', lambda user: rewards.open(user, 0, 0, entry_xp(aggregates[user])), sample, results)
+    run_path('rewards_award', lambda user: rewards.award(user, 'quest', 50, 20, key='Savings Starter'), sample, results)
+    # Steady state: the first pass records the milestones, the timed pass finds nothing changed
+    for user in sample:
+        rewards.sync_milestones(user, milestone_status(features[user], goal, str(current_month)))
+    run_path('rewards_milestones', lambda user: rewards.sync_milestones(
+        user, milestone_status(features[user], goal, str(current_month))), sample, results)
+    run_path('rewards_balance', rewards.account, sample, results)
+
+    store = get_progress_store()
+    counter = iter(range(10 ** 9))
+
+    def save_progress(user):
+        store.update(user, normalize_record(next(counter), 10, [], 1, today, ['Savings Starter'], 2))
+        store.flush()
+    run_path('save_user_progress', save_progress, sample, results)
+
+    upload_path = os.path.abspath('upload.csv')
+    write_upload(upload_path, sample[0], args.upload_rows, args.months, args.seed)
+
+    def upload(_):
+        # The upload file names sample[0] as its owner, so every call replaces that user's ledger
+        with open(upload_path, 'rb') as f:
+            import_csv(ledger, sample[0], f)
+    run_path('upload_import', upload, list(range(args.uploads)), results)
+
+    ledger.close()
+    return results
+
+
+def report(results, baseline=None):
+    header = f"{'path':<24} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    for name, row in results.items():
+        line = f"{name:<24} {row['calls']:>6} {row['p50_ms']:>9.2f}"
+        for key in ('p95_ms', 'p99_ms', 'max_ms'):
+            line += f" {row[key]:>9.2f}" if key in row else f" {'':>9}"
+        line += f" {row['peak_kib']:>10.1f}" if 'peak_kib' in row else f" {'':>10}"
+        if baseline and name in baseline and baseline[name]['p50_ms']:
+            line += f" {row['p50_ms'] / baseline[name]['p50_ms']:>11.2f}x"
+        print(line)
+    print(f"process peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Finora's core data and dashboard paths")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=300, help="transactions per user")
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--samples', type=int, default=50, help="users timed per path")
+    parser.add_argument('--logins', type=int, default=10)
+    parser.add_argument('--uploads', type=int, default=5)
+    parser.add_argument('--upload-rows', type=int, default=20000)
+    parser.add_argument('--storage', choices=['files', 'sqlite'], default='files')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results saved with --save")
+    parser.add_argument('--keep', action='store_true', help="keep the generated data directory")
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
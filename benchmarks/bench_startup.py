@@ -0,0 +1,142 @@
+# -------------------- Startup Benchmark --------------------
+# Measures how quickly a fresh server process becomes useful. Every sample
+# runs in a new interpreter (so nothing is already imported) inside a scratch
+# directory holding a small synthetic dataset:
+#
+#   imports          import cost of streamlit, the login-screen modules and
+#                    the modules loaded after login
+#   login_render     first render of the login screen with AppTest, and which
+#                    heavy libraries it loaded. `import streamlit` already
+#                    loads Plotly; the login-screen finora modules do not, so
+#                    plotly in that list is not App.py's doing
+#   dashboard_cold   first Dashboard render with FINORA_WARM_START=0
+#   dashboard_warm   first Dashboard render after the warm start has finished
+#                    behind the login screen
+#
+#   python -m benchmarks.bench_startup --repeat 5
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'App.py')
+LOGIN_MODULES = ('finora.auth', 'finora.profiler', 'finora.startup')
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'plotly', 'yfinance', 'matplotlib')
+SESSION = dict(username='user000000', goals={}, emergency_fund_goal=0, xp=0, coins=0, redeemed_rewards=[],
+               check_in_streak=0, last_check_in=None, quests_completed=[], quiz_score=0)
+
+
+# -------------------- Child Process --------------------
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def child_imports():
+    import importlib
+    result = {}
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    result['streamlit_ms'] = elapsed_ms(start)
+    start = time.perf_counter()
+    for name in LOGIN_MODULES:
+        importlib.import_module(name)
+    result['login_modules_ms'] = elapsed_ms(start)
+    from finora.startup import WARM_MODULES
+    start = time.perf_counter()
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+    result['app_modules_ms'] = elapsed_ms(start)
+    return result
+
+
+def child_render(mode):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    result = {'login_render_ms': elapsed_ms(start)}
+    if mode == 'login_render':
+        result['heavy_loaded'] = [name for name in HEAVY_MODULES if name in sys.modules]
+        return result
+    if mode == 'dashboard_warm':
+        import threading
+        start = time.perf_counter()
+        for thread in threading.enumerate():
+            if thread.name == 'finora-warm-start':
+                thread.join()
+        result['warm_wait_ms'] = elapsed_ms(start)
+        from finora.startup import report
+        result['warm_steps_ms'] = report()
+    for key, value in SESSION.items():
+        at.session_state[key] = value
+    start = time.perf_counter()
+    at.run()
+    result['dashboard_render_ms'] = elapsed_ms(start)
+    if at.exception:
+        result['error'] = str(at.exception[0].value)
+    return result
+
+
+# -------------------- Parent --------------------
+def run_child(mode, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT, FINORA_MARKET_PROVIDER='none',
+               FINORA_WARM_START='1' if mode == 'dashboard_warm' else '0')
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode], cwd=workdir, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result['process_ms'] = elapsed_ms(start)
+    return result
+
+
+def report(results):
+    # Imported here, not at module level, so the child processes start without NumPy
+    import numpy as np
+    for mode, samples in results.items():
+        print(f"{mode}:")
+        numeric = [key for key, value in samples[0].items() if isinstance(value, (int, float))]
+        for key in numeric:
+            values = np.array([sample[key] for sample in samples])
+            print(f"  {key:<22} median {np.median(values):>9.1f} ms   min {values.min():>9.1f} ms")
+        for key, value in samples[-1].items():
+            if key not in numeric:
+                print(f"  {key:<22} {value}")
+        if mode == 'login_render':
+            print(f"  {'':<22} (plotly comes from `import streamlit` itself, not from the login-screen finora modules)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Finora's cold start and first renders")
+    parser.add_argument('--repeat', type=int, default=3, help="fresh processes per measurement")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=300, help="transactions per user")
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = child_imports() if args.child == 'imports' else child_render(args.child)
+        print(json.dumps(result))
+        return
+
+    from benchmarks.synthetic import generate
+    workdir = tempfile.mkdtemp(prefix='finora-startup-')
+    try:
+        generate(workdir, args.users, args.transactions, rounds=10000)
+        results = {mode: [run_child(mode, workdir) for _ in range(args.repeat)]
+                   for mode in ('imports', 'login_render', 'dashboard_cold', 'dashboard_warm')}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report(results)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -------------------- Synthetic Data Generator --------------------
+# Writes users.csv, user_progress.csv and user_data.csv in the app's own
+# formats, sized users x transactions-per-user spread over `months` months,
+# so storage and aggregation changes can be measured at realistic scale.
+#
+#   python -m benchmarks.synthetic --out /tmp/finora-bench --users 1000 --transactions 500 --months 12
+import argparse
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+from passlib.hash import pbkdf2_sha256
+
+from finora.progress import PROGRESS_COLUMNS, encode_list
+from finora.rules import QUESTS
+
+PASSWORD = 'benchmark-password'
+EXPENSE_CATEGORIES = ["Food", "Transport", "Entertainment", "Savings", "Education", "Rent", "Utilities", "Clothing", "Health", "Debt Repayment"]
+
+
+def username(i):
+    return f"user{i:06d}"
+
+
+def generate(out, users=100, transactions=200, months=12, seed=0, rounds=29000):
+    """Write the three CSV stores under `out`. Every user's password is PASSWORD."""
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    names = [username(i) for i in range(users)]
+
+    # One hash shared by every user keeps generation fast; verification cost is unchanged
+    password_hash = pbkdf2_sha256.using(rounds=rounds).hash(PASSWORD)
+    with open(os.path.join(out, 'users.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Username', 'Password'])
+        writer.writerows([name, password_hash] for name in names)
+
+    quest_names = list(QUESTS)
+    with open(os.path.join(out, 'user_progress.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(PROGRESS_COLUMNS)
+        for name in names:
+            done = [quest for quest in quest_names if rng.random() < 0.3]
+            writer.writerow([name, float(rng.integers(0, 2000)), float(rng.integers(0, 300)), encode_list([]),
+                             float(rng.integers(0, 10)), '', encode_list(done), float(rng.integers(0, 4))])
+
+    # Written in blocks of users so memory stays flat for large configurations
+    path = os.path.join(out, 'user_data.csv')
+    block = max(1, 200000 // max(transactions, 1))
+    for start in range(0, users, block):
+        frame = transactions_frame(rng, names[start:start + block], transactions, months)
+        frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return names
+
+
+def transactions_frame(rng, names, per_user, months):
+    """`per_user` random entries for each of `names`, dated within the last `months` months."""
+    n = len(names) * per_user
+    end = pd.Timestamp.today().normalize()
+    income = rng.random(n) < 0.25
+    return pd.DataFrame({
+        'Username': np.repeat(names, per_user),
+        'Type': np.where(income, 'Income', 'Expense'),
+        'Amount': np.where(income, rng.integers(500, 20000, n), rng.integers(10, 3000, n)).astype(float),
+        'Category': np.where(income, 'Income', rng.choice(EXPENSE_CATEGORIES, n)),
+        'Date': (end - pd.to_timedelta(rng.integers(0, max(int(months * 30.4), 1), n), unit='D')).strftime('%Y-%m-%d'),
+    })
+
+
+def write_upload(path, name, transactions=200, months=12, seed=1):
+    """One user's upload file, as a bank export or another Finora instance would produce."""
+    transactions_frame(np.random.default_rng(seed), [name], transactions, months).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic Finora data files")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=200, help="transactions per user")
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out, args.users, args.transactions, args.months, args.seed)
+    print(f"Wrote {args.users} users x {args.transactions} transactions over {args.months} months to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Finora storage and analytics helpers used by App.py
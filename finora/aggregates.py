@@ -0,0 +1,99 @@
+# -------------------- Monthly Aggregates --------------------
+# Materialized per-user totals keyed by (Month, Type, Category). The table is
+# built once from the user's ledger and then updated in place for every new
+# entry, so dashboard metrics and charts cost O(months x categories) instead
+# of a scan over every transaction. Tables are shared between sessions
+# through finora.cache, stamped with the ledger version they reflect. Amounts
+# are integer paise, so the running totals stay exact however many entries
+# are folded in.
+import pandas as pd
+
+from finora.cache import datasets
+
+
+class MonthlyAggregates:
+    def __init__(self):
+        self._cells = {}  # (Month, Type, Category) -> [Amount in paise, Count]
+
+    @classmethod
+    def from_ledger(cls, data):
+        aggregates = cls()
+        if data.empty:
+            return aggregates
+        months = pd.to_datetime(data['Date']).dt.to_period('M')
+        grouped = data.groupby([months, data['Type'].astype(str), data['Category'].astype(str)], observed=True)['Amount'].agg(['sum', 'count'])
+        aggregates._cells = {key: [int(total), int(count)] for key, total, count in
+                             zip(grouped.index, grouped['sum'], grouped['count'])}
+        return aggregates
+
+    def add(self, entry_type, amount, category, entry_date):
+        key = (pd.Timestamp(entry_date).to_period('M'), str(entry_type), str(category))
+        cell = self._cells.setdefault(key, [0, 0])
+        cell[0] += int(amount)
+        cell[1] += 1
+
+    def with_entry(self, entry_type, amount, category, entry_date):
+        """A copy including one more entry; the shared original is left untouched."""
+        aggregates = MonthlyAggregates()
+        aggregates._cells = {key: list(cell) for key, cell in self._cells.items()}
+        aggregates.add(entry_type, amount, category, entry_date)
+        return aggregates
+
+    # ---- queries ----
+    def empty(self):
+        return not self._cells
+
+    def entry_count(self, entry_type=None):
+        return sum(count for (_, type_, _), (_, count) in self._cells.items() if entry_type is None or type_ == entry_type)
+
+    def total(self, entry_type, month=None, category=None):
+        return sum(amount for (month_, type_, category_), (amount, _) in self._cells.items()
+                   if type_ == entry_type and (month is None or month_ == month)
+                   and (category is None or category_.lower() == category.lower()))
+
+    def month_totals(self, month):
+        """(income, expense) for one month."""
+        return self.total('Income', month), self.total('Expense', month)
+
+    def categories(self, month=None):
+        return {category for (month_, _, category) in self._cells if month is None or month_ == month}
+
+    def by_month_type(self):
+        """Month x Type amounts, the shape of the Monthly Overview chart."""
+        if not self._cells:
+            return pd.DataFrame()
+        sums = {}
+        for (month, type_, _), (amount, _) in self._cells.items():
+            sums[(month, type_)] = sums.get((month, type_), 0) + amount
+        return pd.Series(sums, dtype='int64').unstack().fillna(0).astype('int64').sort_index()
+
+    def category_breakdown(self, month, entry_type='Expense'):
+        breakdown = {}
+        for (month_, type_, category), (amount, _) in self._cells.items():
+            if month_ == month and type_ == entry_type:
+                breakdown[category] = breakdown.get(category, 0) + amount
+        return pd.Series(breakdown, dtype='int64').sort_index()
+
+    def monthly_net(self):
+        """Income minus expenses per month, oldest first."""
+        net = {}
+        for (month, type_, _), (amount, _) in self._cells.items():
+            if type_ == 'Income':
+                net[month] = net.get(month, 0) + amount
+            elif type_ == 'Expense':
+                net[month] = net.get(month, 0) - amount
+        return pd.Series(net, dtype='int64').sort_index()
+
+
+def user_aggregates(ledger, username):
+    """The user's aggregate table, rebuilt only when their ledger changed."""
+    return datasets.get(('aggregates', id(ledger), username), ledger.version(username),
+                        lambda: MonthlyAggregates.from_ledger(ledger.load_user(username)))
+
+
+def record_entry(ledger, username, entry_type, amount, category, entry_date):
+    """Append an entry (amount in paise) to the ledger and fold it into the cached aggregate table."""
+    before = ledger.version(username)
+    ledger.append(username, entry_type, amount, category, entry_date)
+    datasets.advance(('aggregates', id(ledger), username), before, ledger.version(username),
+                     lambda aggregates: aggregates.with_entry(entry_type, amount, category, entry_date))
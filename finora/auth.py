@@ -0,0 +1,203 @@
+# -------------------- Authentication --------------------
+# Username -> password hash lookups come from an in-memory index instead of
+# re-reading users.csv on every login. The index is rebuilt only when the
+# file's stats change and is updated in place on registration, which appends
+# one row rather than rewriting the file. With FINORA_STORAGE=sqlite lookups
+# are primary-key queries and the index is not used.
+#
+# PBKDF2 is deliberately slow, so hashing and verification run on a small
+# bounded pool. hashlib releases the GIL while it iterates, so a burst of
+# logins occupies at most `FINORA_AUTH_WORKERS` cores and other sessions keep
+# rendering; when too many attempts are already queued, AuthBusy is raised
+# instead of piling up more work.
+#
+# finora.db pulls in pandas and the ledger stores, so it is only imported when
+# FINORA_STORAGE=sqlite; with file storage the login screen needs neither.
+#
+# FINORA_AUTH_PROFILE picks the PBKDF2 round count used for new hashes.
+# Existing hashes carry their own round count and keep verifying.
+import csv
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.hash import pbkdf2_sha256
+
+from finora.cache import file_version
+from finora.storage import sqlite_enabled
+
+USERS_PATH = 'users.csv'
+USER_COLUMNS = ['Username', 'Password']
+WORK_FACTORS = {
+    'fast': 10000,       # local development and benchmarks only
+    'standard': 29000,   # passlib's default, matches existing users.csv hashes
+    'strong': 600000,
+}
+
+
+class AuthBusy(Exception):
+    """Too many password checks are already queued."""
+
+
+def work_factor(profile=None):
+    profile = profile or os.environ.get('FINORA_AUTH_PROFILE', 'standard')
+    if profile not in WORK_FACTORS:
+        raise ValueError(f"Unknown auth profile {profile!r}; choose one of {', '.join(WORK_FACTORS)}")
+    return WORK_FACTORS[profile]
+
+
+class Hasher:
+    def __init__(self, rounds=None, workers=None, max_pending=None, timeout=30.0):
+        self.rounds = rounds or work_factor()
+        self.workers = workers or int(os.environ.get('FINORA_AUTH_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self._scheme = pbkdf2_sha256.using(rounds=self.rounds)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='finora-auth')
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 8)
+
+    def hash(self, password):
+        return self._run(self._scheme.hash, password)
+
+    def verify(self, password, stored_hash):
+        return self._run(_verify, password, stored_hash)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise AuthBusy("Too many login attempts right now. Please try again in a moment.")
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def _verify(password, stored_hash):
+    try:
+        return pbkdf2_sha256.verify(password, stored_hash)
+    except ValueError:
+        # Malformed or non-PBKDF2 hash in users.csv
+        return False
+
+
+class UserIndex:
+    def __init__(self, path=USERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hashes = None
+        self._version = None
+
+    def get(self, username):
+        with self._lock:
+            return self._current().get(username)
+
+    def __contains__(self, username):
+        return self.get(username) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._current())
+
+    def add(self, username, password_hash):
+        """Append a user to users.csv. Returns False if the username is already taken."""
+        with self._lock:
+            hashes = self._current()
+            if username in hashes:
+                return False
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            needs_newline = not new_file and not _ends_with_newline(self.path)
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                if needs_newline:
+                    f.write('\n')
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(USER_COLUMNS)
+                writer.writerow([username, password_hash])
+            hashes[username] = password_hash
+            self._version = file_version(self.path)
+            return True
+
+    def _current(self):
+        version = file_version(self.path)
+        if self._hashes is None or version != self._version:
+            self._hashes = self._load()
+            self._version = version
+        return self._hashes
+
+    def _load(self):
+        hashes = {}
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                # First occurrence wins, as with the old DataFrame lookup
+                for row in csv.DictReader(f):
+                    if row.get('Username') and row['Username'] not in hashes:
+                        hashes[row['Username']] = row.get('Password') or ''
+        except FileNotFoundError:
+            pass
+        return hashes
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+_hasher = None
+_index = None
+_singleton_lock = threading.Lock()
+
+
+def get_hasher():
+    global _hasher
+    with _singleton_lock:
+        if _hasher is None:
+            _hasher = Hasher()
+        return _hasher
+
+
+def get_user_index():
+    global _index
+    with _singleton_lock:
+        if _index is None:
+            _index = UserIndex()
+        return _index
+
+
+def _sqlite():
+    """finora.db when FINORA_STORAGE=sqlite, else None."""
+    if not sqlite_enabled():
+        return None
+    from finora import db
+    return db
+
+
+def password_hash(username):
+    db = _sqlite()
+    if db is not None:
+        return db.get_password_hash(username)
+    return get_user_index().get(username)
+
+
+def user_exists(username):
+    return password_hash(username) is not None
+
+
+def save_user(username, password):
+    """Register a user. Returns False if the username is already taken."""
+    hashed_password = get_hasher().hash(password)
+    db = _sqlite()
+    if db is not None:
+        return db.insert_user(username, hashed_password)
+    return get_user_index().add(username, hashed_password)
+
+
+def verify_user(username, password):
+    stored_hash = password_hash(username)
+    if not stored_hash:
+        return False
+    return get_hasher().verify(password, stored_hash)
@@ -0,0 +1,66 @@
+# -------------------- Shared Dataset Cache --------------------
+# One copy of each loaded dataset per process, shared by every Streamlit
+# session. Entries are stamped with the version of the data they were built
+# from (file stats or a store's version tuple); a reader passing a newer
+# version rebuilds the entry, so writers never have to notify readers.
+# Cached values are shared between sessions and must be treated as read-only.
+import os
+import threading
+
+
+class DatasetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (version, value)
+
+    def get(self, key, version, loader):
+        """Cached value for `key` if it was built from `version`, else loader()."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def peek(self, key, version):
+        """Cached value for `key` if it was built from `version`, else None. Never loads."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None and entry[0] == version else None
+
+    def advance(self, key, old_version, new_version, update):
+        """Move an entry built from `old_version` to `new_version` by applying `update`.
+
+        Lets a writer fold its own change into the cached value instead of
+        forcing the next reader to rebuild it. `update` must return a new object.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != old_version:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (new_version, update(entry[1]))
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def file_version(*paths):
+    """(mtime, size) of each path; changes whenever any of the files is rewritten or appended to."""
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+datasets = DatasetCache()
@@ -0,0 +1,49 @@
+# -------------------- Dashboard Charts --------------------
+# Plotly figures for the Monthly Overview and Expense Breakdown, built from
+# the user's aggregate table rather than the raw ledger. Plotly renders in the
+# browser, so the server only serializes a small spec. Figures are cached in
+# finora.cache under (user, month) and stamped with the ledger version, so a
+# rerun reuses them until the underlying numbers change. Cached figures are
+# shared between sessions; st.plotly_chart only reads them. The aggregates
+# are in paise and are plotted in rupees.
+import plotly.graph_objects as go
+
+from finora.aggregates import user_aggregates
+from finora.cache import datasets
+from finora.money import rupees
+
+PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF']
+TYPE_COLORS = {'Income': '#36A2EB', 'Expense': '#FF6384'}
+
+
+def monthly_overview_figure(summary):
+    """Line per entry type over months; `summary` is MonthlyAggregates.by_month_type()."""
+    fig = go.Figure()
+    months = [str(month) for month in summary.index]
+    for entry_type in summary.columns:
+        fig.add_trace(go.Scatter(x=months, y=rupees(summary[entry_type]).tolist(), mode='lines+markers', name=str(entry_type),
+                                 line={'color': TYPE_COLORS.get(entry_type)}))
+    fig.update_layout(margin={'l': 10, 'r': 10, 't': 10, 'b': 10}, height=320, xaxis_type='category',
+                      yaxis_title="Amount (₹)", legend_title_text="Type")
+    return fig
+
+
+def category_pie_figure(breakdown):
+    """Share of each category in `breakdown`, a Series of amounts indexed by category."""
+    fig = go.Figure(go.Pie(labels=breakdown.index.tolist(), values=rupees(breakdown).tolist(), sort=False,
+                           marker={'colors': PIE_COLORS}, texttemplate='%{percent:.1%}',
+                           hovertemplate='%{label}: ₹%{value:,.2f}<extra></extra>'))
+    fig.update_layout(margin={'l': 10, 'r': 10, 't': 10, 'b': 10}, height=360)
+    return fig
+
+
+def dashboard_charts(ledger, username, month):
+    """(overview, breakdown) figures for `month`; breakdown is None when there are no expenses."""
+    def build():
+        aggregates = user_aggregates(ledger, username)
+        summary = aggregates.by_month_type()
+        breakdown = aggregates.category_breakdown(month)
+        overview = monthly_overview_figure(summary) if not summary.empty else None
+        pie = category_pie_figure(breakdown) if not breakdown.empty and breakdown.sum() > 0 else None
+        return overview, pie
+    return datasets.get(('charts', id(ledger), username), (ledger.version(username), str(month)), build)
@@ -0,0 +1,263 @@
+# -------------------- SQLite Storage --------------------
+# Embedded storage engine for users, progress, transactions and reward events,
+# enabled with FINORA_STORAGE=sqlite. The database runs in WAL mode so
+# concurrent Streamlit sessions can read while one writes, every lookup goes
+# through an index on Username, and progress saves are single-row upserts
+# instead of full-file rewrites. Each thread keeps its own connection; sqlite3
+# caches the compiled form of the constant SQL strings below per connection,
+# so repeated calls reuse prepared statements.
+#
+# Transaction amounts are INTEGER paise (see finora.money). Databases created
+# before that hold REAL rupees and are converted in place when first opened.
+# A new database is then filled from the file-based stores. PRAGMA
+# user_version records how far this has got (1: amounts are paise, 2: files
+# imported) and is set in the same transaction as the work, so an import that
+# fails is rolled back and tried again on the next start.
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from finora.ledger import CachedLedger, coerce_ledger, read_partitions
+from finora.profiler import trace_sql
+from finora.progress import PROGRESS_COLUMNS, ProgressStore, to_row
+from finora.rewards import EVENT_COLUMNS, EVENTS_PATH
+
+DB_PATH = 'finora.db'
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    Username TEXT PRIMARY KEY,
+    Password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    Username TEXT PRIMARY KEY,
+    XP INTEGER NOT NULL DEFAULT 0,
+    Coins INTEGER NOT NULL DEFAULT 0,
+    Redeemed_Rewards TEXT NOT NULL DEFAULT '[]',
+    Check_In_Streak REAL NOT NULL DEFAULT 0,
+    Last_Check_In TEXT NOT NULL DEFAULT '',
+    Quests_Completed TEXT NOT NULL DEFAULT '[]',
+    Quiz_Score REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    Username TEXT NOT NULL,
+    Type TEXT NOT NULL,
+    Amount INTEGER NOT NULL,  -- paise
+    Category TEXT NOT NULL,
+    Date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_username_date ON transactions (Username, Date);
+CREATE TABLE IF NOT EXISTS ledger_versions (
+    Username TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reward_events (
+    id INTEGER PRIMARY KEY,
+    Username TEXT NOT NULL,
+    Time TEXT NOT NULL,
+    Kind TEXT NOT NULL,
+    Key TEXT NOT NULL DEFAULT '',
+    XP INTEGER NOT NULL,
+    Coins INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reward_events_username ON reward_events (Username, id);
+"""
+
+SELECT_PASSWORD = "SELECT Password FROM users WHERE Username = ?"
+INSERT_USER = "INSERT INTO users (Username, Password) VALUES (?, ?)"
+SELECT_PROGRESS = "SELECT " + ", ".join(PROGRESS_COLUMNS) + " FROM progress"
+SELECT_USER_PROGRESS = SELECT_PROGRESS + " WHERE Username = ?"
+UPSERT_PROGRESS = (
+    "INSERT INTO progress (" + ", ".join(PROGRESS_COLUMNS) + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (Username) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in PROGRESS_COLUMNS[1:])
+)
+SELECT_TRANSACTIONS = "SELECT Username, Type, Amount, Category, Date FROM transactions WHERE Username = ?"
+INSERT_TRANSACTION = "INSERT INTO transactions (Username, Type, Amount, Category, Date) VALUES (?, ?, ?, ?, ?)"
+DELETE_TRANSACTIONS = "DELETE FROM transactions WHERE Username = ?"
+SELECT_LEDGER_USERS = "SELECT DISTINCT Username FROM transactions"
+COUNT_LEDGER_USERS = "SELECT COUNT(DISTINCT Username) FROM transactions"
+SELECT_LEDGER_VERSION = "SELECT Version FROM ledger_versions WHERE Username = ?"
+BUMP_LEDGER_VERSION = (
+    "INSERT INTO ledger_versions (Username, Version) VALUES (?, 1) "
+    "ON CONFLICT (Username) DO UPDATE SET Version = Version + 1"
+)
+SELECT_REWARD_EVENTS = ("SELECT Username, Time, Kind, Key, XP, Coins FROM reward_events "
+                        "WHERE Username = ? ORDER BY id")
+INSERT_REWARD_EVENT = "INSERT INTO reward_events (Username, Time, Kind, Key, XP, Coins) VALUES (?, ?, ?, ?, ?, ?)"
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def connect(path=DB_PATH):
+    """Per-thread connection with WAL and a busy timeout for concurrent sessions."""
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        with _init_lock:
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.set_trace_callback(trace_sql)
+            if path not in _initialized:
+                conn.executescript(SCHEMA)
+                _upgrade(conn)
+                _initialized.add(path)
+        conns[path] = conn
+    return conn
+
+
+# -------------------- Users --------------------
+def get_password_hash(username):
+    row = connect().execute(SELECT_PASSWORD, (username,)).fetchone()
+    return row[0] if row else None
+
+
+def insert_user(username, password_hash):
+    """Returns False if the username is already taken."""
+    try:
+        connect().execute(INSERT_USER, (username, password_hash))
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+# -------------------- Progress --------------------
+def load_progress(username=None):
+    """Raw progress rows; list columns are returned in their stored text encoding."""
+    if username is None:
+        return pd.read_sql_query(SELECT_PROGRESS, connect())
+    return pd.read_sql_query(SELECT_USER_PROGRESS, connect(), params=(username,))
+
+
+def upsert_progress(row):
+    connect().execute(UPSERT_PROGRESS, tuple(row))
+
+
+# -------------------- Reward Events --------------------
+def load_reward_events(username):
+    return pd.read_sql_query(SELECT_REWARD_EVENTS, connect(), params=(username,))
+
+
+def append_reward_events(rows):
+    conn = connect()
+    with _transaction(conn):
+        conn.executemany(INSERT_REWARD_EVENT, rows)
+
+
+# -------------------- Transactions --------------------
+class SqliteLedger(CachedLedger):
+    """Same interface as finora.ledger.LedgerStore, backed by the transactions table."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+
+    def usernames(self):
+        return [row[0] for row in connect(self.path).execute(SELECT_LEDGER_USERS)]
+
+    def user_count(self):
+        return connect(self.path).execute(COUNT_LEDGER_USERS).fetchone()[0]
+
+    def version(self, username):
+        # Bumped in the same transaction as every write to the user's rows
+        row = connect(self.path).execute(SELECT_LEDGER_VERSION, (username,)).fetchone()
+        return row[0] if row else 0
+
+    def _load_user(self, username, columns=None, start=None, end=None):
+        sql, params = SELECT_TRANSACTIONS, [username]
+        if start is not None:
+            sql += " AND Date >= ?"
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            sql += " AND Date <= ?"
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        data = coerce_ledger(pd.read_sql_query(sql, connect(self.path), params=params))
+        return data[list(columns)] if columns is not None else data
+
+    def _append(self, username, entry_type, amount, category, entry_date):
+        conn = connect(self.path)
+        with _transaction(conn):
+            conn.execute(INSERT_TRANSACTION, (
+                username, entry_type, int(amount), category, pd.Timestamp(entry_date).strftime('%Y-%m-%d')))
+            conn.execute(BUMP_LEDGER_VERSION, (username,))
+
+    def replace_user(self, username, data):
+        self.replace_user_chunks(username, [data])
+
+    def replace_user_chunks(self, username, chunks):
+        conn = connect(self.path)
+        with _transaction(conn):
+            conn.execute(DELETE_TRANSACTIONS, (username,))
+            for chunk in chunks:
+                conn.executemany(INSERT_TRANSACTION, _ledger_rows(chunk[chunk['Username'] == username]))
+            conn.execute(BUMP_LEDGER_VERSION, (username,))
+
+    def close(self):
+        pass
+
+
+class _transaction:
+    # Explicit BEGIN IMMEDIATE so a multi-statement write takes the write lock up front
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
+
+
+def _ledger_rows(data):
+    dates = pd.to_datetime(data['Date']).dt.strftime('%Y-%m-%d')
+    return zip(data['Username'].astype(str), data['Type'].astype(str), data['Amount'].astype('int64').tolist(),
+               data['Category'].astype(str), dates)
+
+
+def _upgrade(conn):
+    # Checked under the write lock so two processes opening an old database upgrade it once
+    with _transaction(conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        if version < 1:
+            amount_type = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(transactions)")}['Amount']
+            if amount_type.upper() == 'REAL':
+                # Rupees to paise in place; the column keeps REAL affinity, which stores whole numbers exactly
+                conn.execute("UPDATE transactions SET Amount = ROUND(Amount * 100)")
+        if version < 2 and not _has_data(conn):
+            # A database that already holds data was filled before this flag existed
+            _import_csv_files(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _has_data(conn):
+    return any(conn.execute(f"SELECT EXISTS (SELECT 1 FROM {table})").fetchone()[0]
+               for table in ('users', 'progress', 'transactions', 'reward_events'))
+
+
+def _import_csv_files(conn):
+    # Copies the file-based stores in; runs inside _upgrade's transaction and never writes to the files
+    if os.path.exists('users.csv'):
+        users = pd.read_csv('users.csv', dtype=str).dropna()
+        conn.executemany("INSERT OR IGNORE INTO users (Username, Password) VALUES (?, ?)",
+                         users[['Username', 'Password']].itertuples(index=False, name=None))
+    if os.path.exists('user_progress.csv'):
+        for username, record in ProgressStore().records().items():
+            conn.execute(UPSERT_PROGRESS, to_row(username, record))
+    if os.path.exists(EVENTS_PATH) and os.path.getsize(EVENTS_PATH) > 0:
+        events = pd.read_csv(EVENTS_PATH, dtype=str, keep_default_na=False)
+        conn.executemany(INSERT_REWARD_EVENT, events[EVENT_COLUMNS].itertuples(index=False, name=None))
+    for username, data in read_partitions(fmt=os.environ.get('FINORA_LEDGER_FORMAT', 'csv')):
+        conn.executemany(INSERT_TRANSACTION, _ledger_rows(data))
@@ -0,0 +1,125 @@
+# -------------------- Data Export --------------------
+# "Download My Data" payloads are built only when the user asks for one, by
+# streaming the ledger through the chosen encoder `chunk_rows` rows at a time,
+# so no intermediate full-size text copy of the frame is ever made. The last
+# payload per user is kept in finora.cache stamped with the ledger version and
+# format, so downloading again costs nothing until the ledger changes.
+#
+# The ledger holds paise; exports carry rupees, exactly: two-place decimal
+# text in CSV, the same text as a JSON string in JSON Lines, and a
+# decimal(19, 2) column in Parquet.
+import importlib.util
+import io
+from dataclasses import dataclass
+
+from finora.cache import datasets
+from finora.ledger import LEDGER_COLUMNS
+from finora.money import rupee_text
+
+CHUNK_ROWS = 20000
+
+
+def iter_csv(data, chunk_rows=CHUNK_ROWS):
+    yield (','.join(LEDGER_COLUMNS) + '\n').encode('utf-8')
+    for start in range(0, len(data), chunk_rows):
+        chunk = data.iloc[start:start + chunk_rows].copy()
+        chunk['Amount'] = rupee_text(chunk['Amount'])
+        yield chunk.to_csv(index=False, header=False, date_format='%Y-%m-%d').encode('utf-8')
+
+
+def iter_jsonl(data, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(data), chunk_rows):
+        chunk = data.iloc[start:start + chunk_rows].copy()
+        chunk['Date'] = chunk['Date'].dt.strftime('%Y-%m-%d')
+        # A JSON string, so the two places survive ("1000.00", not 1000.0)
+        chunk['Amount'] = rupee_text(chunk['Amount'])
+        yield chunk.to_json(orient='records', lines=True, force_ascii=False).encode('utf-8')
+
+
+def iter_parquet(data, chunk_rows=CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # Each chunk becomes a row group; bytes are handed on as soon as the writer emits them
+    sink = io.BytesIO()
+    columns = [('Username', pa.string()), ('Type', pa.string()), ('Amount', pa.int64()),
+               ('Category', pa.string()), ('Date', pa.timestamp('ns'))]
+    rupee_type = pa.decimal128(19, 2)
+    schema = pa.schema(columns).set(2, pa.field('Amount', rupee_type))
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for start in range(0, len(data), chunk_rows):
+            chunk = data.iloc[start:start + chunk_rows].astype({'Username': str, 'Type': str, 'Category': str})
+            table = pa.Table.from_pandas(chunk, schema=pa.schema(columns), preserve_index=False)
+            # A decimal's storage is its unscaled integer, so paise read at scale 2 are rupees
+            amount = pa.chunked_array([chunk.cast(pa.decimal128(19, 0)).view(rupee_type)
+                                       for chunk in table.column('Amount').chunks], rupee_type)
+            writer.write_table(table.set_column(2, schema.field(2), amount))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    label: str
+    extension: str
+    mime: str
+    encode: object
+    requires: str = None
+
+
+EXPORT_FORMATS = {
+    'csv': ExportFormat("CSV", 'csv', 'text/csv', iter_csv),
+    'parquet': ExportFormat("Parquet", 'parquet', 'application/vnd.apache.parquet', iter_parquet, requires='pyarrow'),
+    'jsonl': ExportFormat("JSON Lines", 'jsonl', 'application/jsonl', iter_jsonl),
+}
+
+
+def available_formats():
+    names = []
+    for name, fmt in EXPORT_FORMATS.items():
+        # find_spec checks the package is installed without paying for its import
+        if fmt.requires is not None and importlib.util.find_spec(fmt.requires) is None:
+            continue
+        names.append(name)
+    return names
+
+
+@dataclass(frozen=True)
+class Export:
+    username: str
+    format: str
+    payload: bytes
+
+    @property
+    def filename(self):
+        return f"{self.username}_budget_data.{EXPORT_FORMATS[self.format].extension}"
+
+    @property
+    def mime(self):
+        return EXPORT_FORMATS[self.format].mime
+
+
+def _cache_key(ledger, username):
+    return ('export', type(ledger).__name__, id(ledger), username)
+
+
+def cached_export(ledger, username, fmt):
+    """The last export of `username`'s ledger in `fmt`, or None if it is missing or stale."""
+    return datasets.peek(_cache_key(ledger, username), (ledger.version(username), fmt))
+
+
+def build_export(ledger, username, fmt):
+    """Encode `username`'s ledger in `fmt`, reusing the cached payload when nothing changed."""
+    def encode():
+        data = ledger.load_user(username)[LEDGER_COLUMNS]
+        sink = io.BytesIO()
+        for block in EXPORT_FORMATS[fmt].encode(data):
+            sink.write(block)
+        return Export(username, fmt, sink.getvalue())
+    return datasets.get(_cache_key(ledger, username), (ledger.version(username), fmt), encode)
@@ -0,0 +1,154 @@
+# -------------------- CSV Import --------------------
+# Uploaded CSVs are streamed into the ledger in bounded chunks: each chunk is
+# parsed with explicit dtypes, validated, checked for repeats of rows seen so
+# far and handed to the ledger's replace_user_chunks(), which writes it
+# straight into the new snapshot (or SQLite transaction). Memory therefore
+# depends on `chunksize`, plus 8 bytes of row hash per distinct entry, kept
+# as one sorted uint64 array that each chunk is checked against with a binary
+# search and merged into. The replace is atomic: a rejected file leaves the ledger as it was.
+#
+# Entries have no id, so two identical purchases on one day are legitimately
+# identical rows. Repeats are kept and only reported, unless the caller asks
+# for drop_duplicates=True.
+#
+# App.py applies each uploaded file once, keyed by content_hash(), instead of
+# on every rerun while the uploader still holds it.
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from finora.ledger import LEDGER_COLUMNS
+from finora.money import parse_rupees
+
+CHUNK_ROWS = 50000
+ENTRY_TYPES = ('Income', 'Expense')
+DEDUP_COLUMNS = ['Type', 'Amount', 'Category', 'Date']
+
+
+class ImportRejected(ValueError):
+    """The uploaded file cannot be imported; the message is shown to the user."""
+
+
+@dataclass
+class ImportResult:
+    rows_read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    other_users: int = 0
+    duplicates_dropped: bool = False
+
+    def summary(self):
+        skipped = []
+        if self.duplicates and self.duplicates_dropped:
+            skipped.append(f"{self.duplicates} duplicate")
+        if self.invalid:
+            skipped.append(f"{self.invalid} invalid")
+        message = f"Imported {self.imported} entries for your account."
+        if skipped:
+            message += f" Skipped {' and '.join(skipped)} rows."
+        if self.duplicates and not self.duplicates_dropped:
+            message += f" {self.duplicates} rows repeat an earlier row exactly and were kept; check the file if that is unexpected."
+        return message
+
+
+def content_hash(fileobj, block_size=1 << 20):
+    """SHA-256 of a file object's contents, leaving it rewound."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(block_size), b''):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def read_chunks(fileobj, chunksize=CHUNK_ROWS):
+    """Raw ledger chunks with every column read as text."""
+    fileobj.seek(0)
+    try:
+        reader = pd.read_csv(fileobj, usecols=lambda col: col in LEDGER_COLUMNS, dtype=str,
+                             keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            missing = [col for col in LEDGER_COLUMNS if col not in chunk.columns]
+            if missing:
+                raise ImportRejected(f"Uploaded CSV must contain columns: {', '.join(LEDGER_COLUMNS)}")
+            yield chunk[LEDGER_COLUMNS]
+    except pd.errors.EmptyDataError:
+        raise ImportRejected("The uploaded CSV is empty.")
+    except pd.errors.ParserError as e:
+        raise ImportRejected(f"Failed to parse uploaded CSV: {str(e)}")
+
+
+class RowHashes:
+    """Sorted hashes of the rows seen so far."""
+
+    def __init__(self):
+        self.sorted = np.empty(0, dtype=np.uint64)
+
+    def first_seen(self, keys):
+        """Mask of `keys` not seen in an earlier chunk or earlier in `keys`; remembers them all."""
+        unique, first = np.unique(keys, return_index=True)
+        fresh = np.zeros(len(keys), dtype=bool)
+        fresh[first] = True
+        if len(self.sorted):
+            found = self.sorted[np.minimum(np.searchsorted(self.sorted, keys), len(self.sorted) - 1)]
+            fresh &= found != keys
+        self.sorted = np.union1d(self.sorted, unique)
+        return fresh
+
+
+def clean_chunk(chunk, username, result, seen, drop_duplicates=False):
+    """Keep `username`'s valid rows of a raw chunk, updating `result`'s counters.
+
+    Rows repeating one already seen are counted, and dropped only with `drop_duplicates`.
+    """
+    result.rows_read += len(chunk)
+    mine = chunk['Username'].str.strip() == username
+    result.other_users += int((~mine).sum())
+    chunk = chunk[mine]
+
+    rows = pd.DataFrame({
+        'Username': username,
+        'Type': chunk['Type'].str.strip().str.capitalize(),
+        'Amount': parse_rupees(chunk['Amount'].str.replace(',', '', regex=False)),
+        'Category': chunk['Category'].str.strip(),
+        'Date': pd.to_datetime(chunk['Date'], errors='coerce'),
+    }, index=chunk.index)
+    valid = (rows['Type'].isin(ENTRY_TYPES) & np.isfinite(rows['Amount']) & (rows['Amount'] >= 0)
+             & (rows['Category'] != '') & rows['Date'].notna())
+    result.invalid += int((~valid).sum())
+    rows = rows[valid].astype({'Amount': 'int64'})
+
+    keys = pd.util.hash_pandas_object(rows[DEDUP_COLUMNS], index=False).to_numpy()
+    fresh = seen.first_seen(keys)
+    result.duplicates += int(len(keys) - fresh.sum())
+    if drop_duplicates:
+        rows = rows[fresh]
+    result.imported += len(rows)
+    return rows
+
+
+def import_csv(ledger, username, fileobj, chunksize=CHUNK_ROWS, progress=None, drop_duplicates=False):
+    """Replace `username`'s ledger with their rows from an uploaded CSV.
+
+    `progress(fraction)` is called after each chunk when the file size is known.
+    Raises ImportRejected, without touching the ledger, if nothing can be imported.
+    """
+    result = ImportResult(duplicates_dropped=drop_duplicates)
+    seen = RowHashes()
+    total_bytes = getattr(fileobj, 'size', None)
+
+    def chunks():
+        for chunk in read_chunks(fileobj, chunksize):
+            yield clean_chunk(chunk, username, result, seen, drop_duplicates)
+            if progress is not None and total_bytes:
+                progress(min(fileobj.tell() / total_bytes, 1.0))
+        if result.imported == 0:
+            if result.rows_read and result.other_users == result.rows_read:
+                raise ImportRejected("No data in the uploaded CSV matches your username.")
+            raise ImportRejected("The uploaded CSV has no valid entries for your account.")
+
+    ledger.replace_user_chunks(username, chunks())
+    return result
@@ -0,0 +1,89 @@
+# -------------------- Leaderboard --------------------
+# Real peer rankings over stored progress. Each metric keeps its entries as a
+# sorted list of (-score, username) so rank, percentile and top-K pages are
+# binary searches and slices. The index is built once from the progress store
+# and then kept current by the store's update hook, so it never rescans users.
+# Updates are a bisect plus a list insert/delete, whose memmove stays in the
+# microseconds even at 100k+ users.
+import threading
+from bisect import bisect_left, insort
+
+METRICS = {'xp': 'XP', 'quiz': 'Quiz_Score'}
+
+
+class RankIndex:
+    def __init__(self):
+        self._keys = []     # sorted (-score, username)
+        self._scores = {}   # username -> score
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set(self, username, score):
+        score = float(score)
+        old = self._scores.get(username)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, username))]
+        insort(self._keys, (-score, username))
+        self._scores[username] = score
+
+    def score(self, username):
+        return self._scores.get(username)
+
+    def rank(self, score, username=None):
+        """1-based rank of `score`: one more than the number of strictly higher scores.
+
+        `username`'s own stored score is ignored so a live, unsaved score can be ranked.
+        """
+        higher = bisect_left(self._keys, (-float(score),))
+        own = self._scores.get(username)
+        if own is not None and own > score:
+            higher -= 1
+        return higher + 1
+
+    def total(self, username=None):
+        """Number of ranked users, counting `username` even if not stored yet."""
+        return len(self._keys) + (1 if username is not None and username not in self._scores else 0)
+
+    def top(self, k=10, page=0):
+        return [(username, -neg_score) for neg_score, username in self._keys[page * k:(page + 1) * k]]
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {metric: RankIndex() for metric in METRICS}
+
+    def update(self, username, record):
+        with self._lock:
+            for metric, field in METRICS.items():
+                self._indexes[metric].set(username, record[field])
+
+    def rank(self, metric, score, username=None):
+        """(rank, total, percentile) for `score` among all stored users."""
+        with self._lock:
+            index = self._indexes[metric]
+            rank = index.rank(score, username)
+            total = max(index.total(username), 1)
+        return rank, total, (1 - rank / total) * 100
+
+    def top(self, metric, k=10, page=0):
+        with self._lock:
+            return self._indexes[metric].top(k, page)
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Process-wide leaderboard fed by the progress store."""
+    global _leaderboard
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            from finora.progress import get_progress_store
+            _leaderboard = Leaderboard()
+            get_progress_store().subscribe(_leaderboard.update)
+        return _leaderboard
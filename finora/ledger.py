@@ -0,0 +1,513 @@
+# -------------------- Transaction Ledger --------------------
+# Transactions are partitioned per user under ledger/. Each partition is a
+# compacted snapshot (<partition>.csv or <partition>.parquet) plus an
+# append-only log (<partition>.log, CSV without a header) so a save costs one
+# line of I/O regardless of how large the ledger is. The log is folded back
+# into the snapshot by compact(), which runs in the background once the log
+# grows past `compact_every` rows. ledger/index.csv maps each Username to its
+# partition.
+#
+# Log lines are flushed on every append but fsynced in groups: after
+# `fsync_every` appends, or by a timer at most `fsync_interval` seconds after
+# the first unsynced one, so a quiet partition is not left unsynced.
+#
+# The snapshot format is pluggable (see SNAPSHOT_FORMATS). Parquet keeps the
+# columns typed on disk, so a cold load skips text parsing and dtype inference
+# and can push column projection and Date predicates down to the reader.
+# Switch formats with FINORA_LEDGER_FORMAT=parquet and convert existing data
+# once with `python -m finora.ledger migrate parquet`.
+#
+# Amount is int64 paise in memory and in Parquet snapshots (see finora.money).
+# CSV snapshots and the log keep decimal rupees with two places, which convert
+# to and from paise exactly; Parquet snapshots written before the switch hold
+# float rupees and are converted when read.
+#
+# Full per-user frames are cached process-wide in finora.cache, stamped with
+# the partition's file stats, so every session of a user shares one copy and
+# a write from any session or process invalidates it.
+import csv
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from finora.cache import datasets, file_version
+from finora.money import parse_rupees, rupee_str, rupee_text
+from finora.storage import sqlite_enabled
+
+LEDGER_COLUMNS = ['Username', 'Type', 'Amount', 'Category', 'Date']
+CATEGORICAL_COLUMNS = ['Username', 'Type', 'Category']
+
+
+def coerce_ledger(data):
+    """Cast a ledger frame to its compact in-memory dtypes."""
+    data = data.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in data.columns:
+            data[col] = data[col].astype(str).astype('category')
+    if 'Amount' in data.columns:
+        # Paise; an unreadable amount counts as zero, as it did when sums skipped NaN
+        data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0).round().astype('int64')
+    if 'Date' in data.columns:
+        data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
+    return data
+
+
+def append_rows(data, rows):
+    """`data` with `rows` added, keeping its dtypes.
+
+    Categorical columns only gain the categories `rows` bring in, so the
+    existing rows are copied but never re-cast.
+    """
+    rows = rows.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in data.columns:
+            values = rows[col].astype(str)
+            new = pd.Index(values.unique()).difference(data[col].cat.categories)
+            if len(new):
+                data = data.assign(**{col: data[col].cat.add_categories(new)})
+            rows[col] = pd.Categorical(values, categories=data[col].cat.categories)
+    rows = rows.astype({col: dtype for col, dtype in data.dtypes.items() if col not in CATEGORICAL_COLUMNS})
+    return pd.concat([data, rows], ignore_index=True)
+
+
+def filter_dates(data, start=None, end=None):
+    if start is not None:
+        data = data[data['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        data = data[data['Date'] <= pd.Timestamp(end)]
+    return data
+
+
+# -------------------- Snapshot Formats --------------------
+class CsvFormat:
+    suffix = '.csv'
+
+    def read(self, path, columns=None, start=None, end=None):
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + (['Date'] if start is not None or end is not None else [])))
+        data = pd.read_csv(path, usecols=usecols, parse_dates=['Date'] if usecols is None or 'Date' in usecols else False)
+        data = filter_dates(data, start, end)
+        if 'Amount' in data.columns:
+            data['Amount'] = parse_rupees(data['Amount'])
+        return data[list(columns)] if columns is not None else data
+
+    def write(self, path, data):
+        self.write_chunks(path, [data])
+
+    def write_chunks(self, path, chunks):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(LEDGER_COLUMNS) + '\n')
+            for chunk in chunks:
+                out = chunk[LEDGER_COLUMNS].copy()
+                out['Amount'] = rupee_text(out['Amount'])
+                out['Date'] = pd.to_datetime(out['Date']).dt.strftime('%Y-%m-%d')
+                out.to_csv(f, index=False, header=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ParquetFormat:
+    suffix = '.parquet'
+
+    def read(self, path, columns=None, start=None, end=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        filters = []
+        if start is not None:
+            filters.append(('Date', '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append(('Date', '<=', pd.Timestamp(end)))
+        # Opened from Python so the read shows up in the render profiler
+        with open(path, 'rb') as f:
+            table = pq.read_table(f, columns=list(columns) if columns is not None else None, filters=filters or None)
+        data = table.to_pandas()
+        if 'Amount' in data.columns and table.schema.field('Amount').type == pa.float64():
+            data['Amount'] = parse_rupees(data['Amount'])  # snapshot from before amounts were paise
+        return data
+
+    def write(self, path, data):
+        self.write_chunks(path, [data])
+
+    def write_chunks(self, path, chunks):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        # Plain string columns so every chunk matches one schema; loads re-categorize them
+        schema = pa.schema([('Username', pa.string()), ('Type', pa.string()), ('Amount', pa.int64()),
+                            ('Category', pa.string()), ('Date', pa.timestamp('ns'))])
+        with open(path, 'wb') as f:
+            with pq.ParquetWriter(f, schema, compression='zstd') as writer:
+                for chunk in chunks:
+                    chunk = coerce_ledger(chunk[LEDGER_COLUMNS])
+                    for col in CATEGORICAL_COLUMNS:
+                        chunk[col] = chunk[col].astype(str)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+SNAPSHOT_FORMATS = {'csv': CsvFormat(), 'parquet': ParquetFormat()}
+
+
+def get_format(name):
+    if name not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown ledger format '{name}'. Choose one of: {', '.join(SNAPSHOT_FORMATS)}")
+    if name == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The parquet ledger format requires pyarrow. Install it with `pip install pyarrow`.")
+    return SNAPSHOT_FORMATS[name]
+
+
+# -------------------- Partition Log --------------------
+class TransactionLog:
+    def __init__(self, base, fmt=None, fsync_every=16, fsync_interval=2.0, compact_every=500):
+        self.fmt = fmt or SNAPSHOT_FORMATS['csv']
+        self.path = base + self.fmt.suffix
+        self.log_path = base + '.log'
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._log = None
+        self._log_rows = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+        self._compacting = False
+
+    # ---- reading ----
+    def load(self, columns=None, start=None, end=None):
+        """Snapshot plus any logged entries that have not been compacted yet.
+
+        `columns` projects the result; `start`/`end` bound Date (inclusive).
+        """
+        with self._lock:
+            self._flush()
+            frames = []
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                frames.append(self.fmt.read(self.path, columns, start, end))
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > 0:
+                logged = pd.read_csv(self.log_path, names=LEDGER_COLUMNS, header=None, parse_dates=['Date'])
+                logged = filter_dates(logged, start, end)
+                logged['Amount'] = parse_rupees(logged['Amount'])
+                frames.append(logged[list(columns)] if columns is not None else logged)
+        if not frames:
+            return coerce_ledger(pd.DataFrame(columns=list(columns) if columns is not None else LEDGER_COLUMNS))
+        data = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return coerce_ledger(data)
+
+    # ---- writing ----
+    def append(self, username, entry_type, amount, category, entry_date):
+        """Append one entry (amount in paise) as a single log record. Cost does not depend on ledger size."""
+        row = [username, entry_type, rupee_str(amount), category, pd.Timestamp(entry_date).strftime('%Y-%m-%d')]
+        with self._lock:
+            log = self._open_log()
+            csv.writer(log).writerow(row)
+            log.flush()
+            self._log_rows += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._fsync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self._fsync_pending)
+                self._timer.daemon = True
+                self._timer.start()
+            if self._log_rows >= self.compact_every and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self.compact, daemon=True).start()
+
+    def replace(self, data):
+        """Write `data` as the new snapshot and drop the log."""
+        self.replace_chunks([data])
+
+    def replace_chunks(self, chunks):
+        """Stream frames into a new snapshot and drop the log (used by bulk uploads).
+
+        Nothing changes if iterating `chunks` raises.
+        """
+        with self._lock:
+            self._write_snapshot_chunks(chunks)
+            self._truncate_log()
+
+    def compact(self):
+        """Fold the log into the snapshot with an atomic rename."""
+        with self._lock:
+            try:
+                self._open_log()
+                if self._log_rows == 0:
+                    return
+                self._write_snapshot(self.load())
+                self._truncate_log()
+            finally:
+                self._compacting = False
+
+    def version(self):
+        with self._lock:
+            self._flush()
+            return file_version(self.path, self.log_path)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._fsync()
+                self._log.close()
+                self._log = None
+
+    # ---- internals ----
+    def _open_log(self):
+        if self._log is None:
+            if self._log_rows is None:
+                self._log_rows = 0
+                if os.path.exists(self.log_path):
+                    with open(self.log_path, 'rb') as f:
+                        self._log_rows = sum(1 for _ in f)
+            self._log = open(self.log_path, 'a', newline='', encoding='utf-8')
+        return self._log
+
+    def _flush(self):
+        if self._log is not None:
+            self._log.flush()
+
+    def _fsync_pending(self):
+        with self._lock:
+            self._fsync()
+
+    def _fsync(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._log is not None and self._unsynced:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _write_snapshot(self, data):
+        self._write_snapshot_chunks([data])
+
+    def _write_snapshot_chunks(self, chunks):
+        tmp_path = self.path + '.tmp'
+        try:
+            self.fmt.write_chunks(tmp_path, chunks)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self.path)
+
+    def _truncate_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        open(self.log_path, 'w').close()
+        self._log_rows = 0
+        self._unsynced = 0
+
+
+# -------------------- Ledger Store --------------------
+class CachedLedger:
+    """Shared-cache reads for ledger backends.
+
+    Subclasses provide version(), _load_user() and _append().
+    """
+
+    def load_user(self, username, columns=None, start=None, end=None):
+        """Only `username`'s rows. The full frame is shared between sessions; do not mutate it."""
+        if columns is None and start is None and end is None:
+            return datasets.get(self._cache_key(username), self.version(username), lambda: self._load_user(username))
+        return self._load_user(username, columns, start, end)
+
+    def append(self, username, entry_type, amount, category, entry_date):
+        before = self.version(username)
+        self._append(username, entry_type, amount, category, entry_date)
+        row = pd.DataFrame([[username, entry_type, amount, category, pd.Timestamp(entry_date)]], columns=LEDGER_COLUMNS)
+        datasets.advance(self._cache_key(username), before, self.version(username),
+                         lambda data: append_rows(data, row))
+
+    def _cache_key(self, username):
+        return ('ledger', type(self).__name__, id(self), username)
+
+
+class LedgerStore(CachedLedger):
+    INDEX_COLUMNS = ['Username', 'Partition']
+
+    def __init__(self, root='ledger', legacy_path='user_data.csv', fmt='csv', **log_options):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.csv')
+        self.fmt = get_format(fmt)
+        self.log_options = log_options
+        self._lock = threading.Lock()
+        self._partitions = {}
+        self._logs = {}
+        if not os.path.exists(self.index_path):
+            self._migrate(legacy_path)
+        self._load_index()
+
+    def usernames(self):
+        with self._lock:
+            return list(self._partitions)
+
+    def user_count(self):
+        with self._lock:
+            return len(self._partitions)
+
+    def version(self, username):
+        log = self._log_for(username, create=False)
+        return log.version() if log is not None else None
+
+    def replace_user(self, username, data):
+        """Swap `username`'s partition for `data` without touching anyone else's."""
+        self.replace_user_chunks(username, [data])
+
+    def replace_user_chunks(self, username, chunks):
+        """Like replace_user() for data arriving as a stream of frames."""
+        self._log_for(username, register=False).replace_chunks(chunk[chunk['Username'] == username] for chunk in chunks)
+        # Registered only once the snapshot is in place, so a rejected upload leaves no index entry
+        with self._lock:
+            if username not in self._partitions:
+                self._register(username)
+
+    def convert(self):
+        """Rewrite every partition in this store's snapshot format."""
+        for username in self.usernames():
+            self._log_for(username)
+
+    def close(self):
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+
+    # ---- internals ----
+    def _load_user(self, username, columns=None, start=None, end=None):
+        # Other partitions are never read
+        log = self._log_for(username, create=False)
+        if log is None:
+            return coerce_ledger(pd.DataFrame(columns=list(columns) if columns is not None else LEDGER_COLUMNS))
+        return log.load(columns, start, end)
+
+    def _append(self, username, entry_type, amount, category, entry_date):
+        self._log_for(username).append(username, entry_type, amount, category, entry_date)
+
+    def _log_for(self, username, create=True, register=True):
+        """`username`'s partition log. With register=False a new partition is opened but not yet added to the index."""
+        with self._lock:
+            partition = self._partitions.get(username)
+            if partition is None and file_version(self.index_path) != self._index_version:
+                # Another process registered users since the index was read
+                self._load_index()
+                partition = self._partitions.get(username)
+            if partition is None:
+                if not create:
+                    return None
+                partition = self._register(username) if register else partition_name(username)
+            log = self._logs.get(partition)
+            if log is None:
+                base = os.path.join(self.root, partition)
+                log = TransactionLog(base, self.fmt, **self.log_options)
+                self._convert_partition(base, log)
+                self._logs[partition] = log
+            return log
+
+    def _convert_partition(self, base, log):
+        # A partition written in another format is converted the first time it is opened
+        if os.path.exists(log.path):
+            return
+        for fmt in SNAPSHOT_FORMATS.values():
+            old_path = base + fmt.suffix
+            if fmt is not self.fmt and os.path.exists(old_path):
+                log._write_snapshot(coerce_ledger(fmt.read(old_path)))
+                os.remove(old_path)
+                return
+
+    def _register(self, username):
+        partition = partition_name(username)
+        with open(self.index_path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([username, partition])
+            f.flush()
+            os.fsync(f.fileno())
+        self._partitions[username] = partition
+        self._index_version = file_version(self.index_path)
+        return partition
+
+    def _load_index(self):
+        self._index_version = file_version(self.index_path)
+        index = pd.read_csv(self.index_path, dtype=str, keep_default_na=False)
+        self._partitions = dict(zip(index['Username'], index['Partition']))
+
+    def _migrate(self, legacy_path):
+        # One-shot split of the old global user_data.csv into per-user partitions
+        os.makedirs(self.root, exist_ok=True)
+        partitions = {}
+        if os.path.exists(legacy_path) and os.path.getsize(legacy_path) > 0:
+            legacy = pd.read_csv(legacy_path, parse_dates=['Date'])
+            legacy['Amount'] = parse_rupees(legacy['Amount']).fillna(0)
+            for username, rows in legacy.groupby('Username', sort=False):
+                username = str(username)
+                partitions[username] = partition_name(username)
+                TransactionLog(os.path.join(self.root, partitions[username]), self.fmt)._write_snapshot(rows[LEDGER_COLUMNS])
+        tmp_path = self.index_path + '.tmp'
+        pd.DataFrame(list(partitions.items()), columns=self.INDEX_COLUMNS).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.index_path)
+
+
+def read_partitions(root='ledger', legacy_path='user_data.csv', fmt='csv'):
+    """(username, frame) for every user's transactions, read without writing anything.
+
+    Unlike LedgerStore, neither migrates the legacy file nor converts
+    partitions: each is read in the format it was written in, preferring `fmt`.
+    """
+    index_path = os.path.join(root, 'index.csv')
+    if not os.path.exists(index_path):
+        if os.path.exists(legacy_path) and os.path.getsize(legacy_path) > 0:
+            legacy = pd.read_csv(legacy_path, parse_dates=['Date'])
+            legacy['Amount'] = parse_rupees(legacy['Amount']).fillna(0)
+            for username, rows in legacy.groupby('Username', sort=False):
+                yield str(username), coerce_ledger(rows[LEDGER_COLUMNS])
+        return
+    formats = [get_format(fmt)] + [other for name, other in SNAPSHOT_FORMATS.items() if name != fmt]
+    index = pd.read_csv(index_path, dtype=str, keep_default_na=False)
+    for username, partition in zip(index['Username'], index['Partition']):
+        base = os.path.join(root, partition)
+        written = next((candidate for candidate in formats if os.path.exists(base + candidate.suffix)), formats[0])
+        yield username, TransactionLog(base, written).load()
+
+
+def partition_name(username):
+    # Filesystem-safe and collision-free even for usernames that only differ in punctuation
+    slug = re.sub(r'[^A-Za-z0-9_-]', '_', str(username))[:40]
+    digest = hashlib.sha1(str(username).encode('utf-8')).hexdigest()[:10]
+    return f"{slug}-{digest}"
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Process-wide ledger shared by every Streamlit session."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            if sqlite_enabled():
+                from finora import db
+                _ledger = db.SqliteLedger()
+            else:
+                _ledger = LedgerStore(fmt=os.environ.get('FINORA_LEDGER_FORMAT', 'csv'))
+        return _ledger
+
+
+if __name__ == '__main__':
+    # python -m finora.ledger migrate parquet
+    if len(sys.argv) != 3 or sys.argv[1] != 'migrate':
+        sys.exit("usage: python -m finora.ledger migrate {csv,parquet}")
+    store = LedgerStore(fmt=sys.argv[2])
+    store.convert()
+    store.close()
+    print(f"Converted {store.user_count()} partitions to {sys.argv[2]}.")
@@ -0,0 +1,231 @@
+# -------------------- Market Data --------------------
+# Daily closing prices for the instruments shown next to the investment
+# suggestions. Prices come from a pluggable provider and are kept in a local
+# SQLite time-series cache (market.db), so a render only reads from disk.
+# When a ticker's last fetch is older than the TTL, all stale tickers are
+# refreshed together in one batched provider call on a background thread;
+# the render keeps showing the cached prices meanwhile, and a failed fetch
+# leaves the cache as it was.
+#
+# FINORA_MARKET_PROVIDER selects the provider: 'yfinance' (default), 'fixture'
+# (offline, reads FINORA_MARKET_FIXTURE or the bundled sample prices, which
+# are synthetic) or 'none'. FINORA_MARKET_TTL_HOURS sets the refresh interval.
+import logging
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+MARKET_DB_PATH = 'market.db'
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'market_prices.csv')
+HISTORY_DAYS = 120
+WATCHLIST = {
+    '^NSEI': "Nifty 50",
+    'NIFTYBEES.NS': "Nippon India Nifty BeES (index ETF)",
+    'GOLDBEES.NS': "Nippon India Gold BeES (gold ETF)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    Ticker TEXT NOT NULL,
+    Date TEXT NOT NULL,
+    Close REAL NOT NULL,
+    PRIMARY KEY (Ticker, Date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetches (
+    Ticker TEXT PRIMARY KEY,
+    FetchedAt REAL NOT NULL
+);
+"""
+UPSERT_PRICE = ("INSERT INTO prices (Ticker, Date, Close) VALUES (?, ?, ?) "
+                "ON CONFLICT (Ticker, Date) DO UPDATE SET Close = excluded.Close")
+UPSERT_FETCH = ("INSERT INTO fetches (Ticker, FetchedAt) VALUES (?, ?) "
+                "ON CONFLICT (Ticker) DO UPDATE SET FetchedAt = excluded.FetchedAt")
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- Providers --------------------
+class MarketDataProvider(ABC):
+    """Fetches daily closes as a frame with columns Ticker, Date, Close."""
+
+    @abstractmethod
+    def fetch(self, tickers, start, end):
+        ...
+
+
+class YFinanceProvider(MarketDataProvider):
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+        raw = yf.download(list(tickers), start=start, end=end, group_by='ticker', auto_adjust=False,
+                          progress=False, threads=True)
+        frames = []
+        for ticker in tickers:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                close = raw[ticker]['Close']
+            else:
+                close = raw['Close']
+            close = close.dropna()
+            dates = pd.DatetimeIndex(close.index)
+            if dates.tz is not None:
+                dates = dates.tz_localize(None)
+            frames.append(pd.DataFrame({'Ticker': ticker, 'Date': dates, 'Close': close.to_numpy(dtype=float)}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Ticker', 'Date', 'Close'])
+
+
+class FixtureProvider(MarketDataProvider):
+    """Prices from a CSV with columns Ticker, Date, Close; no network access."""
+
+    def __init__(self, path=FIXTURE_PATH):
+        self.path = path
+
+    def fetch(self, tickers, start, end):
+        data = pd.read_csv(self.path, parse_dates=['Date'])
+        mask = data['Ticker'].isin(list(tickers)) & (data['Date'] >= pd.Timestamp(start)) & (data['Date'] < pd.Timestamp(end))
+        return data[mask].reset_index(drop=True)
+
+
+def get_provider(name=None):
+    name = name or os.environ.get('FINORA_MARKET_PROVIDER', 'yfinance')
+    if name == 'yfinance':
+        return YFinanceProvider()
+    if name == 'fixture':
+        return FixtureProvider(os.environ.get('FINORA_MARKET_FIXTURE') or FIXTURE_PATH)
+    if name == 'none':
+        return None
+    raise ValueError(f"Unknown market data provider '{name}'. Choose one of: yfinance, fixture, none")
+
+
+# -------------------- Cache --------------------
+class MarketData:
+    def __init__(self, provider, path=MARKET_DB_PATH, ttl=6 * 3600, history_days=HISTORY_DAYS):
+        self.provider = provider
+        self.path = path
+        self.ttl = ttl
+        self.history_days = history_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._retry_at = {}  # ticker -> time before which a failed fetch is not retried
+
+    @property
+    def sample(self):
+        """True when prices come from a fixture rather than the market."""
+        return isinstance(self.provider, FixtureProvider)
+
+    def history(self, tickers, refresh=True):
+        """Cached closes for `tickers`, oldest first. Starts a background refresh of stale tickers."""
+        tickers = list(tickers)
+        if refresh and self.provider is not None:
+            stale = self.stale(tickers)
+            if stale:
+                self._refresh_async(stale)
+        placeholders = ','.join('?' * len(tickers))
+        start = (pd.Timestamp.today().normalize() - pd.Timedelta(days=self.history_days)).strftime('%Y-%m-%d')
+        data = pd.read_sql_query(f"SELECT Ticker, Date, Close FROM prices WHERE Ticker IN ({placeholders}) AND Date >= ? "
+                                 "ORDER BY Ticker, Date", self._connect(), params=tickers + [start], parse_dates=['Date'])
+        return data
+
+    def stale(self, tickers):
+        placeholders = ','.join('?' * len(tickers))
+        fetched = dict(self._connect().execute(
+            f"SELECT Ticker, FetchedAt FROM fetches WHERE Ticker IN ({placeholders})", tickers).fetchall())
+        now = time.time()
+        return [ticker for ticker in tickers
+                if now - fetched.get(ticker, 0) >= self.ttl and now >= self._retry_at.get(ticker, 0)]
+
+    def refresh(self, tickers):
+        """Fetch `tickers` in one batched provider call and store the result.
+
+        `end` is exclusive for every provider. Tickers that come back empty are
+        retried after a short backoff rather than waiting out the TTL.
+        """
+        end = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        start = end - pd.Timedelta(days=self.history_days + 1)
+        data = self.provider.fetch(tickers, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+        fetched = set(data['Ticker'].astype(str))
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(UPSERT_PRICE, zip(data['Ticker'].astype(str), pd.to_datetime(data['Date']).dt.strftime('%Y-%m-%d'),
+                                               data['Close'].astype(float)))
+            conn.executemany(UPSERT_FETCH, [(ticker, now) for ticker in fetched])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        missing = [ticker for ticker in tickers if ticker not in fetched]
+        if missing:
+            self._back_off(missing)
+        return len(data)
+
+    def _refresh_async(self, tickers):
+        with self._lock:
+            tickers = [ticker for ticker in tickers if ticker not in self._refreshing]
+            if not tickers:
+                return
+            self._refreshing.update(tickers)
+
+        def run():
+            try:
+                self.refresh(tickers)
+            except Exception:
+                logger.warning("Market data refresh failed for %s", ', '.join(tickers), exc_info=True)
+                self._back_off(tickers)
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(tickers)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _back_off(self, tickers):
+        retry_at = time.time() + min(self.ttl, 300)
+        with self._lock:
+            self._retry_at.update(dict.fromkeys(tickers, retry_at))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        return conn
+
+
+def summarize(history, names=None):
+    """Last close and 1/3-month change per ticker."""
+    rows = []
+    for ticker, prices in history.groupby('Ticker', sort=False):
+        prices = prices.set_index('Date')['Close']
+        last_date = prices.index[-1]
+
+        def change(days):
+            base = prices[prices.index <= last_date - pd.Timedelta(days=days)]
+            return round((prices.iloc[-1] / base.iloc[-1] - 1) * 100, 2) if not base.empty else None
+        rows.append({
+            'Instrument': (names or {}).get(ticker, ticker),
+            'Last Close': round(float(prices.iloc[-1]), 2),
+            '1M Change %': change(30),
+            '3M Change %': change(90),
+            'As Of': last_date.date(),
+        })
+    return pd.DataFrame(rows)
+
+
+_market = None
+_market_lock = threading.Lock()
+
+
+def get_market_data():
+    """Process-wide market data cache."""
+    global _market
+    with _market_lock:
+        if _market is None:
+            ttl = float(os.environ.get('FINORA_MARKET_TTL_HOURS', 6)) * 3600
+            _market = MarketData(get_provider(), ttl=ttl)
+        return _market
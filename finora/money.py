@@ -0,0 +1,59 @@
+# -------------------- Money --------------------
+# Amounts are int64 paise (1/100 rupee) everywhere inside the app: ledger
+# frames, the transaction index, aggregate tables, goals, the emergency fund
+# and the typed stores (SQLite INTEGER, Parquet int64). Totals are exact
+# integer sums, with no float error to accumulate.
+#
+# Rupees only appear at the edges. Text files (the CSV ledger and its log,
+# uploads, CSV and JSON Lines exports) carry decimal rupees with exactly two
+# places; parse_rupees() turns them straight into paise, and rupee_text()
+# writes them back, so a round trip is exact. The UI formats with format_inr() and
+# charts plot rupees().
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+PAISE = 100
+
+
+def to_paise(rupees):
+    """One rupee amount (number or numeric string) as integer paise, rounded half up."""
+    return int((Decimal(str(rupees)) * PAISE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def parse_rupees(values):
+    """Rupee values (numbers or numeric strings) as float paise; unparseable ones become NaN.
+
+    The caller validates and casts to int64. Values with at most two decimals
+    convert exactly; more precise ones are rounded to the nearest paisa.
+    """
+    return np.round(pd.to_numeric(values, errors='coerce') * PAISE)
+
+
+def rupees(paise):
+    """Paise as (float) rupees, for charts and other display-only arithmetic."""
+    return paise / PAISE
+
+
+def rupee_text(paise):
+    """int64 paise Series as exact decimal rupee strings, e.g. 123456 -> '1234.56'."""
+    paise = paise.astype('int64')
+    whole, fraction = np.divmod(paise.abs(), PAISE)
+    sign = pd.Series(np.where(paise < 0, '-', ''), index=paise.index)
+    return sign + whole.astype(str) + '.' + fraction.astype(str).str.zfill(2)
+
+
+def rupee_str(paise):
+    """rupee_text() for a single amount."""
+    paise = int(paise)
+    whole, fraction = divmod(abs(paise), PAISE)
+    return f"{'-' if paise < 0 else ''}{whole}.{fraction:02d}"
+
+
+def format_inr(paise, decimals=2):
+    """Display string for an amount in paise, e.g. 123456 -> '₹1234.56'; decimals=0 rounds to whole rupees."""
+    paise = int(round(paise))
+    if decimals == 0:
+        return f"₹{int((Decimal(paise) / PAISE).quantize(Decimal(1), rounding=ROUND_HALF_UP))}"
+    return f"₹{rupee_str(paise)}"
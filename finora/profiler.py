@@ -0,0 +1,186 @@
+# -------------------- Render Profiler --------------------
+# Times the named sections of each App.py rerun and counts the disk reads and
+# writes made while they run. App.py calls profile.section(name) at the top
+# of each section, so the script needs no re-indentation; a section lasts
+# until the next one starts or the run finishes.
+#
+# File I/O is attributed through a Python audit hook on `open`, and SQLite
+# statements through the connection trace callback in finora.db. Both fire in
+# the calling thread and Streamlit runs every session's script on its own
+# thread, so counts are per rerun even with many sessions in one process.
+#
+# Streamlit fragments rerun on their own, without the rest of the script;
+# profiler.fragment(name) makes such a rerun a record of its own, while a
+# fragment running inside a full rerun is just one more section of it.
+#
+# pandas is only imported for the admin tables, so profiling the login screen
+# does not load it.
+#
+# Finished runs are kept in a process-wide ring buffer for the admin panel
+# (users listed in FINORA_ADMINS) and, when FINORA_PROFILE_LOG names a file,
+# appended to it as JSON lines.
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+SQL_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP')
+SQL_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'SAVEPOINT', 'RELEASE')
+
+_active = threading.local()
+
+
+class RenderProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timestamp = datetime.now()
+        self.sections = {}  # name -> {'ms', 'reads', 'writes', 'sql_reads', 'sql_writes'}
+        self.current = None
+        self._section_start = None
+        self.finished = False
+        self.total_ms = None
+
+    def section(self, name):
+        """End the running section and start timing `name`."""
+        now = time.perf_counter()
+        self._close(now)
+        self.current = self.sections.setdefault(name, {'ms': 0.0, 'reads': 0, 'writes': 0, 'sql_reads': 0, 'sql_writes': 0})
+        self._section_start = now
+
+    def count(self, kind):
+        if self.current is not None:
+            self.current[kind] += 1
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close(now)
+        self.current = None
+        self.finished = True
+        self.total_ms = (now - self.started) * 1000
+
+    def totals(self):
+        return {kind: sum(s[kind] for s in self.sections.values()) for kind in ('reads', 'writes', 'sql_reads', 'sql_writes')}
+
+    def table(self):
+        import pandas as pd
+        table = pd.DataFrame.from_dict(self.sections, orient='index')
+        return table.round({'ms': 1}) if not table.empty else table
+
+    def _close(self, now):
+        if self.current is not None:
+            self.current['ms'] += (now - self._section_start) * 1000
+
+
+class Profiler:
+    def __init__(self, history=500, log_path=None):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        sys.addaudithook(_audit)
+
+    def begin(self):
+        """Start profiling the current rerun on this thread."""
+        profile = RenderProfile()
+        _active.profile = profile
+        return profile
+
+    def finish(self, profile, page=None, user=None):
+        """Record `profile` once; returns None if it was already recorded."""
+        if profile.finished:
+            return None
+        profile.finish()
+        if getattr(_active, 'profile', None) is profile:
+            _active.profile = None
+        record = {
+            'time': profile.timestamp.isoformat(timespec='seconds'),
+            'user': user,
+            'page': page,
+            'total_ms': round(profile.total_ms, 2),
+            **profile.totals(),
+            'sections': {name: {**s, 'ms': round(s['ms'], 2)} for name, s in profile.sections.items()},
+        }
+        with self._lock:
+            self._history.append(record)
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+        return record
+
+    @contextmanager
+    def fragment(self, name, page=None, user=None):
+        """Time a fragment body as section `name`."""
+        running = getattr(_active, 'profile', None)
+        if running is not None and not running.finished:
+            running.section(name)
+            try:
+                yield running
+            except BaseException:
+                # st.rerun()/st.stop() in a fragment ends the whole run here, so record it now
+                self.finish(running, page=page, user=user)
+                raise
+            return
+        profile = self.begin()
+        profile.section(name)
+        try:
+            yield profile
+        finally:
+            self.finish(profile, page=page, user=user)
+
+    def summary(self):
+        """p50/p95 milliseconds per section over the recent runs."""
+        import pandas as pd
+        with self._lock:
+            rows = [(name, s['ms']) for record in self._history for name, s in record['sections'].items()]
+        if not rows:
+            return pd.DataFrame(columns=['runs', 'p50_ms', 'p95_ms'])
+        times = pd.DataFrame(rows, columns=['section', 'ms']).groupby('section', sort=False)['ms']
+        return pd.DataFrame({
+            'runs': times.size(),
+            'p50_ms': times.quantile(0.5).round(1),
+            'p95_ms': times.quantile(0.95).round(1),
+        })
+
+
+def _audit(event, args):
+    # Runs for every audited event in the process, so bail out fast
+    if event != 'open':
+        return
+    profile = getattr(_active, 'profile', None)
+    if profile is None:
+        return
+    _, mode, flags = args
+    writing = (mode is not None and any(c in mode for c in 'wax+')) or bool((flags or 0) & WRITE_FLAGS)
+    profile.count('writes' if writing else 'reads')
+
+
+def trace_sql(statement):
+    """sqlite3 trace callback counting statements against the running profile."""
+    profile = getattr(_active, 'profile', None)
+    if profile is None:
+        return
+    verb = statement[:32].lstrip().upper()
+    if not verb.startswith(SQL_CONTROL):
+        profile.count('sql_writes' if verb.startswith(SQL_WRITES) else 'sql_reads')
+
+
+def is_admin(username):
+    admins = os.environ.get('FINORA_ADMINS', '')
+    return username in {name.strip() for name in admins.split(',') if name.strip()}
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Process-wide profiler; the audit hook is installed once."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler(log_path=os.environ.get('FINORA_PROFILE_LOG') or None)
+        return _profiler
@@ -0,0 +1,242 @@
+# -------------------- Progress Store --------------------
+# Per-user XP, coins, streaks and rewards kept in memory for the whole
+# process. Updates only mark a user dirty when a field actually changes, and
+# dirty records are written behind: a timer coalesces every change made within
+# `flush_interval` seconds into one flush, and logout flushes immediately.
+# CSV flushes write a temp file and rename it over user_progress.csv; with
+# FINORA_STORAGE=sqlite only the dirty rows are upserted.
+#
+# Redeemed_Rewards and Quests_Completed are stored as compact JSON arrays of
+# strings. A column is decoded in one pass: a vectorized regex match (run by
+# Arrow when PyArrow is installed) accepts only cells that are complete arrays
+# of that exact shape, so no cell can run into its neighbour, and the accepted
+# cells are joined into a single json.loads call. Only rejected cells take the
+# slow path: ones in the older str(list) encoding are read through
+# ast.literal_eval rather than eval, anything else decodes to an empty list.
+import ast
+import atexit
+import csv
+import json
+import numbers
+import os
+import threading
+
+import pandas as pd
+
+from finora.storage import sqlite_enabled
+
+PROGRESS_COLUMNS = ['Username', 'XP', 'Coins', 'Redeemed_Rewards', 'Check_In_Streak', 'Last_Check_In', 'Quests_Completed', 'Quiz_Score']
+PROGRESS_DTYPES = {
+    'Username': str,
+    'XP': float,
+    'Coins': float,
+    'Redeemed_Rewards': str,
+    'Check_In_Streak': float,
+    'Last_Check_In': str,
+    'Quests_Completed': str,
+    'Quiz_Score': float,
+}
+LIST_FIELDS = ['Redeemed_Rewards', 'Quests_Completed']
+
+
+# A JSON array of strings as encode_list() writes it, and a Python list of
+# strings as str(list) wrote it before
+JSON_LIST = r'\[(?:"(?:[^"\\]|\\.)*"(?:,"(?:[^"\\]|\\.)*")*)?\]'
+_PY_STRING = r"""(?:'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")"""
+LEGACY_LIST = rf'\[(?:{_PY_STRING}(?:, {_PY_STRING})*)?\]'
+
+
+def encode_list(values):
+    return json.dumps(list(values), ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_list_column(column):
+    """Decode a column of encoded lists in one parse pass; a bad cell only affects its own row."""
+    cells = column.where(column.notna() & (column != ''), '[]').astype(_string_dtype())
+    is_json = cells.str.fullmatch(JSON_LIST).to_numpy(dtype=bool)
+    accepted = cells[is_json]
+    decoded = json.loads('[' + ','.join(accepted.tolist()) + ']')
+    if len(decoded) != len(accepted):
+        raise ValueError("progress list cells did not decode one to one")
+    parts = [pd.Series(decoded, index=accepted.index, dtype=object)]
+    rejected = cells[~is_json]
+    if len(rejected):
+        legacy = rejected.str.fullmatch(LEGACY_LIST).to_numpy(dtype=bool)
+        parts.append(pd.Series([_decode_legacy(value) for value in rejected[legacy].tolist()],
+                               index=rejected.index[legacy], dtype=object))
+        parts.append(pd.Series([[] for _ in range(int((~legacy).sum()))], index=rejected.index[~legacy], dtype=object))
+    return pd.concat(parts).reindex(column.index)
+
+
+def _decode_legacy(value):
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return [str(item) for item in value] if isinstance(value, list) else []
+
+
+def _string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'string'
+    return 'string[pyarrow]'
+
+
+
+def decode_progress(df):
+    for field in LIST_FIELDS:
+        df[field] = decode_list_column(df[field])
+    df['Last_Check_In'] = pd.to_datetime(df['Last_Check_In'], errors='coerce')
+    return df
+
+
+def normalize_record(xp, coins, redeemed_rewards, check_in_streak, last_check_in, quests_completed, quiz_score):
+    # Whole numbers; files written before were floats (e.g. 359.0) and are read as floats
+    def number(value):
+        return int(round(value)) if isinstance(value, numbers.Real) and pd.notna(value) else 0
+    return {
+        'XP': number(xp),
+        'Coins': number(coins),
+        # Copies, so later in-place appends in session state still register as changes
+        'Redeemed_Rewards': list(redeemed_rewards) if isinstance(redeemed_rewards, (list, tuple)) else [],
+        'Check_In_Streak': number(check_in_streak),
+        'Last_Check_In': pd.Timestamp(last_check_in) if pd.notnull(last_check_in) else None,
+        'Quests_Completed': list(quests_completed) if isinstance(quests_completed, (list, tuple)) else [],
+        'Quiz_Score': number(quiz_score),
+    }
+
+
+def clean_username(username):
+    return str(username).replace(',', '').replace('"', '') if username else 'unknown'
+
+
+class ProgressStore:
+    def __init__(self, path='user_progress.csv', use_db=False, flush_interval=5.0):
+        self.path = path
+        self.use_db = use_db
+        self.flush_interval = flush_interval
+        self.load_error = None
+        self._lock = threading.RLock()
+        self._records = None
+        self._dirty = set()
+        self._timer = None
+        self._listeners = []
+
+    # ---- reading ----
+    def get(self, username):
+        """A copy of `username`'s record, or None if they have no progress yet."""
+        with self._lock:
+            record = self._all().get(clean_username(username))
+            return _copy(record) if record is not None else None
+
+    def records(self):
+        with self._lock:
+            return {username: _copy(record) for username, record in self._all().items()}
+
+    def subscribe(self, listener):
+        """Call `listener(username, record)` for every current record and every later change."""
+        with self._lock:
+            for username, record in self._all().items():
+                listener(username, _copy(record))
+            self._listeners.append(listener)
+
+    # ---- writing ----
+    def update(self, username, record):
+        """Stage `record` for `username`. Returns True if anything changed."""
+        username = clean_username(username)
+        with self._lock:
+            records = self._all()
+            if records.get(username) == record:
+                return False
+            records[username] = _copy(record)
+            self._dirty.add(username)
+            for listener in self._listeners:
+                listener(username, _copy(record))
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            if self.use_db:
+                from finora import db
+                for username in self._dirty:
+                    db.upsert_progress(to_row(username, self._records[username]))
+            else:
+                self._write_csv()
+            self._dirty.clear()
+
+    # ---- internals ----
+    def _all(self):
+        if self._records is None:
+            self._records = self._load()
+        return self._records
+
+    def _load(self):
+        if self.use_db:
+            from finora import db
+            df = db.load_progress()
+        elif os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            try:
+                df = pd.read_csv(self.path, dtype=PROGRESS_DTYPES, na_values=['', 'NaN'],
+                                 keep_default_na=False, skipinitialspace=True)
+                if not all(col in df.columns for col in PROGRESS_COLUMNS):
+                    raise ValueError("missing required columns")
+            except Exception as e:
+                # The file is replaced on the next flush
+                self.load_error = f"Failed to parse {self.path}: {str(e)}. Starting with empty progress."
+                return {}
+        else:
+            return {}
+        df = decode_progress(df).dropna(subset=['Username', 'XP', 'Coins', 'Check_In_Streak', 'Quiz_Score'])
+        records = {}
+        for row in df.to_dict('records'):
+            records[row['Username']] = normalize_record(row['XP'], row['Coins'], row['Redeemed_Rewards'], row['Check_In_Streak'],
+                                                        row['Last_Check_In'], row['Quests_Completed'], row['Quiz_Score'])
+        return records
+
+    def _write_csv(self):
+        rows = [to_row(username, record) for username, record in self._records.items()]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            pd.DataFrame(rows, columns=PROGRESS_COLUMNS).to_csv(f, index=False, quoting=csv.QUOTE_NONNUMERIC)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def to_row(username, record):
+    """A record in its stored column order and text encoding."""
+    last_check_in = record['Last_Check_In'].strftime('%Y-%m-%d %H:%M:%S') if record['Last_Check_In'] is not None else ''
+    return [username, record['XP'], record['Coins'], encode_list(record['Redeemed_Rewards']), record['Check_In_Streak'],
+            last_check_in, encode_list(record['Quests_Completed']), record['Quiz_Score']]
+
+
+def _copy(record):
+    record = dict(record)
+    for field in LIST_FIELDS:
+        record[field] = list(record[field])
+    return record
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_progress_store():
+    """Process-wide progress store shared by every Streamlit session."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProgressStore(use_db=sqlite_enabled())
+            atexit.register(_store.flush)
+        return _store
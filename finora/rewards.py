@@ -0,0 +1,270 @@
+# -------------------- Rewards Ledger --------------------
+# XP and coins are event sourced. Every change to a balance is one row in an
+# append-only event log (Username, Time, Kind, Key, XP, Coins):
+#
+#   opening     starts a user's log, carrying over the balances in user_progress
+#   entries     XP for logged transactions (see rules.ENTRY_XP), recorded as
+#               the difference whenever the ledger's count changes
+#   check_in    the daily check-in
+#   quest       a completed quest
+#   quiz        quiz points beyond the best score so far
+#   milestone   goal, streak and emergency fund bonuses (rules.MILESTONES); a
+#               negative row takes one back when its condition stops holding
+#   baseline    milestones already counted in an opening balance
+#   redemption  coins spent on a reward
+#
+# Rows carry their final deltas, so a balance is the plain sum of the user's
+# rows and replay() rebuilds it exactly. As before, every 10 XP earned also
+# earns a coin; that share is worked out when a row is appended and included
+# in its Coins.
+#
+# Running balances are kept per user in memory and advanced as rows are
+# appended, so reading one is a dict lookup and nothing is recomputed on a
+# render. Check-ins, quests and redemptions are keyed, so each is recorded
+# once however many reruns ask for it, and an award worth nothing is not
+# recorded at all. The only rows that may be worth nothing are markers: the
+# opening row that starts a log and the baseline row that follows it. XP and
+# Coins in user_progress remain a materialized copy for the leaderboard and
+# the login screen; `python -m finora.rewards audit` replays every log and
+# reports copies that disagree.
+#
+# Events go to reward_events.csv, or the reward_events table with
+# FINORA_STORAGE=sqlite, where each user's rows are loaded on first use.
+import csv
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from finora.storage import sqlite_enabled
+
+EVENTS_PATH = 'reward_events.csv'
+EVENT_COLUMNS = ['Username', 'Time', 'Kind', 'Key', 'XP', 'Coins']
+KEYED_KINDS = ('check_in', 'quest', 'redemption')
+XP_PER_COIN = 10
+
+
+@dataclass
+class Account:
+    xp: int = 0
+    coins: int = 0
+    entry_xp: int = 0
+    quiz_xp: int = 0
+    keys: set = field(default_factory=set)        # (kind, key) of keyed awards
+    milestones: set = field(default_factory=set)  # milestone keys currently held
+    needs_baseline: bool = False
+
+    def apply(self, kind, key, xp, coins):
+        self.xp += xp
+        self.coins += coins
+        if kind == 'entries':
+            self.entry_xp += xp
+        elif kind == 'quiz':
+            self.quiz_xp += xp
+        elif kind == 'opening':
+            self.needs_baseline = key == 'legacy'
+        elif kind == 'baseline':
+            self.milestones.update(name for name in key.split('|') if name)
+            self.needs_baseline = False
+        elif kind == 'milestone':
+            (self.milestones.add if xp > 0 else self.milestones.discard)(key)
+        elif kind in KEYED_KINDS:
+            self.keys.add((kind, key))
+
+
+def replay(rows):
+    """Account rebuilt from `rows` of (Kind, Key, XP, Coins), oldest first."""
+    account = Account()
+    for kind, key, xp, coins in rows:
+        account.apply(kind, key, int(xp), int(coins))
+    return account
+
+
+class RewardLedger:
+    def __init__(self, path=EVENTS_PATH, use_db=False):
+        self.path = path
+        self.use_db = use_db
+        self._lock = threading.RLock()
+        self._accounts = None if not use_db else {}
+
+    # ---- reading ----
+    def account(self, username):
+        """`username`'s running balance (read-only), or None if their log has not started."""
+        with self._lock:
+            return self._account(username)
+
+    def events(self, username):
+        """`username`'s events, oldest first."""
+        if self.use_db:
+            from finora import db
+            return db.load_reward_events(username)
+        data = self._read_csv()
+        return data[data['Username'] == username].reset_index(drop=True)
+
+    def audit(self, balances):
+        """Users whose `balances` ({username: (xp, coins)}) differ from a replay of their events."""
+        data = self._read_csv() if not self.use_db else None
+        mismatches = []
+        for username, stored in balances.items():
+            events = data[data['Username'] == username] if data is not None else self.events(username)
+            if events.empty:
+                continue
+            account = replay(events[['Kind', 'Key', 'XP', 'Coins']].itertuples(index=False, name=None))
+            if (account.xp, account.coins) != tuple(stored):
+                mismatches.append((username, tuple(stored), (account.xp, account.coins)))
+        return mismatches
+
+    # ---- writing ----
+    def open(self, username, xp, coins, entry_xp, quiz_xp=0):
+        """Start `username`'s log from the balances they already have, once.
+
+        `entry_xp` is what their current ledger is worth and `quiz_xp` what
+        their last quiz score was; XP already stored is assumed to include
+        both, and only an entry shortfall is credited.
+        """
+        with self._lock:
+            account = self._account(username)
+            if account is not None:
+                return account
+            xp, coins = int(xp), int(coins)
+            quiz_xp = min(int(quiz_xp), max(xp - entry_xp, 0))
+            opening = max(xp - entry_xp - quiz_xp, 0)
+            # A credited shortfall earns its coins like any other XP
+            credited = (opening + quiz_xp + entry_xp) // XP_PER_COIN - xp // XP_PER_COIN
+            events = [('opening', 'legacy' if xp > 0 else '', opening, coins)]
+            if entry_xp or credited:
+                events.append(('entries', '', entry_xp, credited))
+            if quiz_xp:
+                events.append(('quiz', '', quiz_xp, 0))
+            self._append(username, events)
+            return self._account(username)
+
+    def award(self, username, kind, xp=0, coins=0, key=''):
+        """Record an award (or a spend, with negative coins).
+
+        Returns False, recording nothing, if it is worth nothing or a keyed one was already recorded.
+        """
+        with self._lock:
+            account = self._account(username)
+            if (not xp and not coins) or (kind in KEYED_KINDS and (kind, key) in account.keys):
+                return False
+            self._append(username, [self._event(account, kind, key, xp, coins)])
+            return True
+
+    def raise_quiz(self, username, xp):
+        """Award the part of a quiz result worth `xp` that beats the best so far. Returns the XP awarded."""
+        with self._lock:
+            gain = xp - self._account(username).quiz_xp
+            if gain <= 0:
+                return 0
+            self.award(username, 'quiz', gain)
+            return gain
+
+    def sync_entries(self, username, entry_xp):
+        """Bring entry XP in line with what the ledger is worth now. Returns True if a row was appended."""
+        with self._lock:
+            account = self._account(username)
+            delta = entry_xp - account.entry_xp
+            if not delta:
+                return False
+            self._append(username, [self._event(account, 'entries', '', delta, 0)])
+            return True
+
+    def sync_milestones(self, username, status):
+        """Award or take back milestones from `status`, a list of (key, xp, met). Returns True if anything changed."""
+        with self._lock:
+            account = self._account(username)
+            if account.needs_baseline:
+                # The opening balance already counts whatever was met when the log started
+                self._append(username, [('baseline', '|'.join(key for key, _, met in status if met), 0, 0)])
+                return False
+            changes = [(key, xp if met else -xp) for key, xp, met in status if met != (key in account.milestones)]
+            if not changes:
+                return False
+            # Each row's coin share is worked out on the balance left by the rows before it
+            pending = Account(xp=account.xp, coins=account.coins)
+            rows = []
+            for key, xp in changes:
+                rows.append(self._event(pending, 'milestone', key, xp, 0))
+                pending.apply(*rows[-1])
+            self._append(username, rows)
+            return True
+
+    # ---- internals ----
+    def _event(self, account, kind, key, xp, coins):
+        coins += (account.xp + xp) // XP_PER_COIN - account.xp // XP_PER_COIN
+        # A take-back never leaves the user owing coins
+        return kind, key, int(xp), int(max(coins, -account.coins))
+
+    def _account(self, username):
+        if self.use_db:
+            if username not in self._accounts:
+                events = self.events(username)
+                self._accounts[username] = (replay(events[['Kind', 'Key', 'XP', 'Coins']].itertuples(index=False, name=None))
+                                            if not events.empty else None)
+            return self._accounts[username]
+        if self._accounts is None:
+            self._accounts = {}
+            data = self._read_csv()
+            for name, events in data.groupby('Username', sort=False):
+                self._accounts[name] = replay(events[['Kind', 'Key', 'XP', 'Coins']].itertuples(index=False, name=None))
+        return self._accounts.get(username)
+
+    def _append(self, username, events):
+        time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(username, time, kind, key, xp, coins) for kind, key, xp, coins in events]
+        if self.use_db:
+            from finora import db
+            db.append_reward_events(rows)
+        else:
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if fresh:
+                    writer.writerow(EVENT_COLUMNS)
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+        account = self._accounts.get(username) or Account()
+        for event in events:
+            account.apply(*event)
+        self._accounts[username] = account
+
+    def _read_csv(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        return pd.read_csv(self.path, dtype={'Username': str, 'Time': str, 'Kind': str, 'Key': str, 'XP': 'int64',
+                                             'Coins': 'int64'}, keep_default_na=False)
+
+
+_rewards = None
+_rewards_lock = threading.Lock()
+
+
+def get_rewards():
+    """Process-wide rewards ledger shared by every Streamlit session."""
+    global _rewards
+    with _rewards_lock:
+        if _rewards is None:
+            _rewards = RewardLedger(use_db=sqlite_enabled())
+        return _rewards
+
+
+def main(argv):
+    if argv[:1] != ['audit']:
+        print("usage: python -m finora.rewards audit")
+        return 2
+    from finora.progress import get_progress_store
+    balances = {username: (record['XP'], record['Coins']) for username, record in get_progress_store().records().items()}
+    mismatches = get_rewards().audit(balances)
+    for username, stored, replayed in mismatches:
+        print(f"{username}: stored XP/coins {stored[0]}/{stored[1]}, replayed {replayed[0]}/{replayed[1]}")
+    print(f"{len(mismatches)} of {len(balances)} users differ from their event log")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
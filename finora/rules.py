@@ -0,0 +1,151 @@
+# -------------------- Quest & Achievement Rules --------------------
+# Quests and achievements are plain data: a metric name, a threshold and what
+# the user gets for reaching it. extract_features() computes every metric the
+# rules refer to once per render, and evaluate() checks all rules against that
+# single feature dict. Money metrics and thresholds are in paise.
+#
+# XP is awarded through the rewards ledger (finora.rewards): ENTRY_XP prices
+# logged transactions, and milestone_status() reports which MILESTONES and
+# this month's goal bonus currently hold so the ledger can award or take back
+# only the ones that changed.
+from dataclasses import dataclass
+
+from finora.money import PAISE
+
+
+@dataclass(frozen=True)
+class Quest:
+    name: str
+    metric: str
+    threshold: float
+    task: str
+    xp: int
+    coins: int
+
+
+@dataclass(frozen=True)
+class Milestone:
+    name: str
+    metric: str
+    threshold: float
+    xp: int
+
+
+@dataclass(frozen=True)
+class Achievement:
+    name: str
+    group: str
+    metric: str
+    threshold: float
+    icon: str
+    description: str  # shown in the badge gallery
+    message: str      # shown when the badge is displayed in its section
+    meaning: str
+    style: str = 'success'
+
+
+QUESTS = {quest.name: quest for quest in [
+    Quest("Expense Tracker", 'recent_expenses', 5, "Log 5 expenses in a week", 30, 10),
+    Quest("Savings Starter", 'balance', 2000 * PAISE, "Save ₹2,000 in a month", 50, 20),
+    Quest("Budget Builder", 'unique_days', 10, "Log entries for 10 days", 40, 15),
+    Quest("Debt Crusher", 'debt_payments', 1000 * PAISE, "Pay off ₹1,000 in Debt Repayment", 40, 15),
+    Quest("Category Explorer", 'current_month_categories', 3, "Use 3 new categories in a month", 25, 10),
+    Quest("Consistency Star", 'week_days_logged', 5, "Log entries every day for 5 days in a week", 35, 12),
+]}
+
+# Bonus XP that is held only while its condition holds
+MILESTONES = [
+    Milestone("logged_7_days", 'unique_days', 7, 20),
+    Milestone("logged_30_days", 'unique_days', 30, 50),
+    Milestone("savings_streak_2", 'savings_streak', 2, 30),
+    Milestone("check_in_3", 'check_in_streak', 3, 10),
+    Milestone("check_in_7", 'check_in_streak', 7, 20),
+    Milestone("emergency_fund_half", 'emergency_progress', 0.5, 30),
+    Milestone("emergency_fund_full", 'emergency_progress', 1.0, 50),
+]
+GOAL_XP = 50
+ENTRY_XP = {'Income': 5, 'Expense': 3}
+
+ACHIEVEMENTS = [
+    Achievement("Budget Beginner", 'savings', 'total_saved', 1000 * PAISE, "💸", "Saved ₹1,000", "Saved ₹1,000", "You've started building a savings habit!"),
+    Achievement("Smart Saver", 'savings', 'total_saved', 5000 * PAISE, "🎯", "Saved ₹5,000", "Saved ₹5,000", "You're prioritizing financial security!"),
+    Achievement("Wealth Warrior", 'savings', 'total_saved', 10000 * PAISE, "🏆", "Saved ₹10,000", "Saved ₹10,000", "You're on the path to wealth creation!"),
+    Achievement("Consistency Champ", 'savings', 'entry_count', 10, "🗂️", "10+ entries logged", "10+ entries logged", "Consistent tracking is key to financial awareness!", 'info'),
+    Achievement("Diverse Tracker", 'savings', 'category_count', 5, "🎨", "5+ unique categories", "5+ unique categories", "You're understanding your spending patterns!", 'info'),
+    Achievement("Category Master", 'savings', 'category_count', 10, "🌈", "10+ unique categories", "10+ unique categories", "You're mastering comprehensive budgeting!", 'info'),
+    Achievement("3-Day Streak", 'logging', 'unique_days', 3, "🔥", "Logged entries for 3 days", "Keep logging daily!", "Early consistency builds strong habits."),
+    Achievement("1-Week Streak", 'logging', 'unique_days', 7, "🚀", "Logged entries for 7 days", "One week strong!", "You're forming a routine."),
+    Achievement("2-Week Streak", 'logging', 'unique_days', 14, "🌟", "Logged entries for 14 days", "Impressive dedication!", "You're committed to financial tracking."),
+    Achievement("3-Week Streak", 'logging', 'unique_days', 21, "⚡", "Logged entries for 21 days", "Unstoppable!", "Long-term habits lead to success."),
+    Achievement("1-Month Consistency Hero", 'logging', 'unique_days', 30, "🏅", "Logged entries for 30 days", "A true budgeting pro!", "You've built a solid foundation."),
+    Achievement("2-Month Legend", 'logging', 'unique_days', 60, "👑", "Logged entries for 60 days", "A budgeting legend!", "Your discipline is inspiring."),
+    Achievement("Savings Sprout", 'savings_streak', 'savings_streak', 2, "🌱", "2+ months of positive balance", "2+ months of positive balance!", "Consistent saving builds wealth."),
+    Achievement("Savings Tree", 'savings_streak', 'savings_streak', 4, "🌳", "4+ months of positive balance", "4+ months of positive balance!", "Your savings are growing strong."),
+    Achievement("3-Day Check-In Streak", 'check_in', 'check_in_streak', 3, "🌟", "Checked in for 3 days", "Great daily engagement!", "Regular monitoring keeps you in control."),
+    Achievement("7-Day Check-In Streak", 'check_in', 'check_in_streak', 7, "🚀", "Checked in for 7 days", "Amazing consistency!", "You're mastering daily financial awareness."),
+    Achievement("Quarter Funded", 'emergency_fund', 'emergency_progress', 0.25, "🏦", "25% of emergency fund goal", "25% of emergency fund goal!", "You're building a safety net."),
+    Achievement("Half Funded", 'emergency_fund', 'emergency_progress', 0.5, "🏧", "50% of emergency fund goal", "50% of emergency fund goal!", "Your financial security is growing."),
+    Achievement("Fully Funded", 'emergency_fund', 'emergency_progress', 1.0, "🎉", "Emergency fund goal achieved", "Emergency fund goal achieved!", "You're prepared for the unexpected."),
+]
+
+
+def extract_features(transactions, aggregates, streaks, current_month, check_in_streak, emergency_fund_goal):
+    """Every metric used by QUESTS and ACHIEVEMENTS, computed once.
+
+    `transactions` is the user's TransactionIndex; month figures come from the aggregate table.
+    """
+    income_cur, expense_cur = aggregates.month_totals(current_month)
+    emergency_savings = aggregates.total('Income', category='income')
+    return {
+        'recent_expenses': len(transactions.between(streaks.week_start, entry_type='Expense')),
+        'balance': income_cur - expense_cur,
+        'current_month_expenses': expense_cur,
+        'unique_days': streaks.unique_days,
+        'week_days_logged': streaks.week_days_logged,
+        'savings_streak': streaks.savings_streak,
+        'debt_payments': aggregates.total('Expense', category='Debt Repayment'),
+        'current_month_categories': len(aggregates.categories(current_month)),
+        'category_count': len(aggregates.categories()),
+        'entry_count': aggregates.entry_count(),
+        'total_saved': aggregates.total('Income') - aggregates.total('Expense'),
+        'check_in_streak': check_in_streak,
+        'emergency_savings': emergency_savings,
+        # No goal means no emergency fund badges
+        'emergency_progress': min(emergency_savings / emergency_fund_goal, 1.0) if emergency_fund_goal > 0 else None,
+    }
+
+
+def is_met(rule, features):
+    value = features.get(rule.metric)
+    return value is not None and value >= rule.threshold
+
+
+def evaluate(rules, features):
+    return [rule for rule in rules if is_met(rule, features)]
+
+
+def new_quest_completions(features, completed):
+    return [quest for quest in evaluate(QUESTS.values(), features) if quest.name not in completed]
+
+
+def entry_xp(aggregates):
+    """XP the user's logged transactions are worth."""
+    return sum(xp * aggregates.entry_count(entry_type) for entry_type, xp in ENTRY_XP.items())
+
+
+def goal_met(goal, features):
+    if goal['type'] == 'Savings':
+        return features['balance'] >= goal['amount']
+    return features['current_month_expenses'] <= goal['amount']
+
+
+def milestone_status(features, goal, month):
+    """(key, xp, met) for each milestone that applies now; `goal` is `month`'s goal or None.
+
+    Emergency fund milestones only apply while there is a fund goal.
+    """
+    status = [(milestone.name, milestone.xp, is_met(milestone, features))
+              for milestone in MILESTONES if features.get(milestone.metric) is not None]
+    if goal is not None:
+        status.append((f"goal:{month}", GOAL_XP, goal_met(goal, features)))
+    return status
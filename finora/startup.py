@@ -0,0 +1,82 @@
+# -------------------- Startup --------------------
+# App.py imports only Streamlit, authentication and the profiler up front, so
+# a fresh server process can render the login screen without loading pandas,
+# NumPy, Plotly or PyArrow. Everything behind the login is imported where it
+# is first needed: the shared data modules once a user is logged in, and the
+# page modules (charts, market data, projections, import/export) on the page
+# that uses them.
+#
+# With FINORA_WARM_START=1 (the default) the first login screen a process
+# renders also starts a background thread that imports those modules and
+# opens the shared stores, so they are usually loaded by the time someone
+# logs in. FINORA_WARM_START=0 leaves everything to first use.
+#
+# Each warmed step is timed; report() returns the timings, and
+# benchmarks/bench_startup.py measures cold start end to end.
+import importlib
+import os
+import threading
+import time
+
+WARM_MODULES = (
+    'pandas',
+    'numpy',
+    'finora.ledger',
+    'finora.progress',
+    'finora.aggregates',
+    'finora.leaderboard',
+    'finora.rewards',
+    'finora.rules',
+    'finora.streaks',
+    'finora.transactions',
+    'finora.charts',
+    'finora.market',
+    'finora.projections',
+    'finora.importer',
+    'finora.export',
+)
+
+timings = {}  # step -> ms, filled in by the warm-start thread
+_started = False
+_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get('FINORA_WARM_START', '1') != '0'
+
+
+def warm_start(modules=WARM_MODULES):
+    """Import `modules` and open the shared stores on a background thread, once per process."""
+    global _started
+    with _lock:
+        if _started or not enabled():
+            return False
+        _started = True
+    threading.Thread(target=_warm, args=(modules,), name='finora-warm-start', daemon=True).start()
+    return True
+
+
+def _warm(modules):
+    for name in modules:
+        _timed(name, importlib.import_module, name)
+    from finora.ledger import get_ledger
+    from finora.progress import get_progress_store
+    from finora.rewards import get_rewards
+    _timed('open ledger', get_ledger)
+    _timed('open progress store', get_progress_store)
+    _timed('open rewards ledger', lambda: get_rewards().account(''))
+
+
+def _timed(step, fn, *args):
+    start = time.perf_counter()
+    try:
+        fn(*args)
+    except Exception:
+        # Warming is best effort; the page that needs the step will surface the error
+        return
+    timings[step] = (time.perf_counter() - start) * 1000
+
+
+def report():
+    """Warm-start timings as {step: ms}, in the order they ran."""
+    return {step: round(ms, 1) for step, ms in list(timings.items())}
@@ -0,0 +1,10 @@
+# -------------------- Storage Selection --------------------
+# FINORA_STORAGE picks where users, progress, transactions and reward events
+# are kept: 'files' (the default CSV and ledger stores) or 'sqlite'
+# (finora.db). This module imports nothing beyond os, so the login screen can
+# check the setting without loading finora.db and, through it, pandas.
+import os
+
+
+def sqlite_enabled():
+    return os.environ.get('FINORA_STORAGE', 'files') == 'sqlite'
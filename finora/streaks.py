@@ -0,0 +1,35 @@
+# -------------------- Streaks --------------------
+# Savings and logging streaks. Logged days are counted on the user's
+# date-sorted TransactionIndex, so both the all-time and the weekly count are a
+# couple of binary searches. Monthly net balances come from the aggregate table.
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Streaks:
+    monthly_net: pd.Series   # income - expenses per logged month, oldest first
+    savings_streak: int      # consecutive most-recent logged months with a positive balance
+    unique_days: int         # distinct days with at least one entry
+    week_start: date
+    week_days_logged: int    # distinct days logged from week_start through today
+
+
+def compute_streaks(transactions, monthly_net, today):
+    """`transactions` is the user's finora.transactions.TransactionIndex."""
+    week_start = today - timedelta(days=today.weekday())
+
+    monthly_net = monthly_net.sort_index()
+    positive = (monthly_net.to_numpy() > 0)[::-1]
+    savings_streak = len(positive) if positive.all() else int(np.argmin(positive))
+
+    return Streaks(
+        monthly_net=monthly_net,
+        savings_streak=savings_streak,
+        unique_days=transactions.between().days(),
+        week_start=week_start,
+        week_days_logged=transactions.between(week_start, today).days(),
+    )
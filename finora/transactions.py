@@ -0,0 +1,151 @@
+# -------------------- Transaction Index --------------------
+# A per-user copy of the ledger sorted by Date, with the columns held as NumPy
+# arrays (Type and Category as integer codes). Date ranges are located with
+# searchsorted, so a query only touches the rows inside its window: between()
+# returns views of that slice, and week or month questions (entries, totals,
+# distinct days logged) cost O(log n + k) rather than a pass over the whole
+# ledger. The Full Data table is served one page at a time instead of sending
+# the whole ledger to the browser. Indexes are cached in finora.cache per user, stamped
+# with the ledger version, and shared read-only between sessions.
+import numpy as np
+import pandas as pd
+
+from finora.cache import datasets
+
+TABLE_COLUMNS = ['Date', 'Type', 'Category', 'Amount']
+
+
+class TransactionIndex:
+    def __init__(self, data):
+        order = np.argsort(data['Date'].to_numpy(dtype='datetime64[ns]'), kind='stable')
+        self.frame = data[TABLE_COLUMNS].iloc[order].reset_index(drop=True)
+        self.dates = self.frame['Date'].to_numpy(dtype='datetime64[ns]')
+        self.amounts = self.frame['Amount'].to_numpy(dtype='int64')  # paise
+        types = self.frame['Type'].astype('category')
+        categories = self.frame['Category'].astype('category')
+        self.type_codes = types.cat.codes.to_numpy()
+        self.category_codes = categories.cat.codes.to_numpy()
+        self.types = list(types.cat.categories)
+        self.categories = list(categories.cat.categories)
+        # Position of the first entry of every distinct day, for O(log n) day counts
+        days = self.dates.astype('datetime64[D]')
+        self.day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.empty(0, dtype='int64')
+
+    def __len__(self):
+        return len(self.dates)
+
+    def date_bounds(self):
+        """(first, last) entry dates, or None for an empty ledger."""
+        if not len(self):
+            return None
+        return pd.Timestamp(self.dates[0]).date(), pd.Timestamp(self.dates[-1]).date()
+
+    def window(self, start=None, end=None):
+        """[lo, hi) positions of the entries dated within [start, end] (whole days)."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start).normalize()), 'left'))
+        if end is None:
+            hi = len(self)
+        else:
+            next_day = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+            hi = int(np.searchsorted(self.dates, next_day, 'left'))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None, entry_type=None, category=None):
+        """Entries dated within [start, end] (whole days) matching every given filter.
+
+        Locating the window is two binary searches; the type and category
+        filters only look at the rows inside it.
+        """
+        lo, hi = self.window(start, end)
+        mask = None
+        if entry_type is not None or category is not None:
+            mask = np.ones(hi - lo, dtype=bool)
+            if entry_type is not None:
+                mask &= self.type_codes[lo:hi] == self._code(self.types, entry_type)
+            if category is not None:
+                mask &= self.category_codes[lo:hi] == self._code(self.categories, category)
+        return TransactionWindow(self, lo, hi, mask)
+
+    def positions(self, start=None, end=None, entry_type=None, category=None):
+        """Sorted positions matching every given filter."""
+        return self.between(start, end, entry_type, category).positions()
+
+    def count(self, start=None, end=None, entry_type=None, category=None):
+        return len(self.between(start, end, entry_type, category))
+
+    def page(self, page=0, page_size=25, start=None, end=None, entry_type=None, category=None):
+        """(rows, total) for one page of the matching entries, newest first."""
+        matches = self.positions(start, end, entry_type, category)
+        total = len(matches)
+        first = max(total - page * page_size, 0)
+        last = max(first - page_size, 0)
+        rows = self.frame.iloc[matches[last:first][::-1]]
+        return rows.reset_index(drop=True), total
+
+    @staticmethod
+    def _code(values, value):
+        try:
+            return values.index(value)
+        except ValueError:
+            return -2  # matches nothing; -1 is pandas' code for missing values
+
+
+class TransactionWindow:
+    """Result of TransactionIndex.between.
+
+    Without filters the arrays are views of the index's [lo, hi) slice and
+    nothing is copied; with filters only the matching rows of that slice are.
+    """
+
+    def __init__(self, index, lo, hi, mask=None):
+        self.index = index
+        self.lo = lo
+        self.hi = hi
+        self.mask = mask
+
+    def __len__(self):
+        return self.hi - self.lo if self.mask is None else int(self.mask.sum())
+
+    def _select(self, values):
+        values = values[self.lo:self.hi]
+        return values if self.mask is None else values[self.mask]
+
+    @property
+    def dates(self):
+        return self._select(self.index.dates)
+
+    @property
+    def amounts(self):
+        return self._select(self.index.amounts)
+
+    @property
+    def type_codes(self):
+        return self._select(self.index.type_codes)
+
+    @property
+    def category_codes(self):
+        return self._select(self.index.category_codes)
+
+    def positions(self):
+        if self.mask is None:
+            return np.arange(self.lo, self.hi)
+        return np.flatnonzero(self.mask) + self.lo
+
+    def total(self):
+        """Sum of the amounts in paise."""
+        return int(self.amounts.sum())
+
+    def days(self):
+        """Number of distinct days with at least one entry."""
+        if self.mask is None:
+            # Window bounds fall on day boundaries, so this counts the days starting inside it
+            starts = self.index.day_starts
+            return int(np.searchsorted(starts, self.hi, 'left') - np.searchsorted(starts, self.lo, 'left'))
+        days = self.dates.astype('datetime64[D]')
+        return int(np.count_nonzero(days[1:] != days[:-1]) + 1) if len(days) else 0
+
+
+def transaction_index(ledger, username):
+    """The user's date-sorted index, rebuilt only when their ledger changed."""
+    return datasets.get(('transactions', id(ledger), username), ledger.version(username),
+                        lambda: TransactionIndex(ledger.load_user(username)))